@@ -0,0 +1,189 @@
+"""Benchmarks for plot construction and comp serialization over synthetic data.
+
+Run from the repository root:
+
+    python bench/bench_fuplot.py --output bench_results.json
+
+Every case is timed a few times and the best run is kept. Results are written as
+JSON, tagged with the current commit, so runs can be compared between commits."""
+
+from contextlib import contextmanager
+from pathlib import Path
+import argparse
+import io
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from fuplot import FuPlot, aes  # noqa: E402
+from fuplot import geometry  # noqa: E402
+from fuplot.fusionize import fusionize_array  # noqa: E402
+from pysion import Composition  # noqa: E402
+
+SIZES = [10**i for i in range(2, 7)]
+
+
+def make_data(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "t": np.arange(n, dtype=np.float64),
+            "x": rng.random(n),
+            "y": np.cumsum(rng.normal(size=n)),
+            "size": rng.random(n),
+            "category": rng.integers(0, 50, n).astype(str),
+        }
+    )
+
+
+def best_of(repeat: int, func) -> tuple[float, object]:
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def serialize(plot: FuPlot) -> str:
+    """Same steps as FuPlot.render, without the clipboard."""
+
+    plot._resolve()
+    comp = Composition()
+    tools = list(plot._iter_layers())
+    comp.add_tools(*(tools + plot._render_merges(tools, "chain", comp)))
+    return repr(comp)
+
+
+@contextmanager
+def without_templates():
+    """Sends every row through pysion, the way comps were written before row
+    templates, to measure what they save."""
+
+    geometry.TEMPLATES = False
+    try:
+        yield
+    finally:
+        geometry.TEMPLATES = True
+
+
+def geom_cases(data: pd.DataFrame, node_rows: bool) -> dict[str, FuPlot]:
+    cases = {
+        "geom_line": FuPlot(data, aes("t", "y")).geom_line(),
+        "geom_line_lttb": FuPlot(data, aes("t", "y")).geom_line(decimate="lttb"),
+        "geom_line_raster": FuPlot(data, aes("t", "y")).geom_line(backend="raster"),
+        # a single Loader at any size
+        "geom_point_raster": FuPlot(data, aes("x", "y")).geom_point(
+            mapping=aes(size="size"), backend="raster"
+        ),
+    }
+    # one node per row: only up to --node-limit rows
+    if node_rows:
+        cases["geom_point_mask"] = FuPlot(data, aes("x", "y")).geom_point()
+        cases["geom_point_shape"] = FuPlot(data, aes("x", "y")).geom_point(
+            mapping=aes(size="size"), backend="shape"
+        )
+        cases["geom_col"] = FuPlot(data, aes("t", "y")).geom_col()
+        cases["geom_point_shape_precision"] = FuPlot(
+            data, aes("x", "y"), precision="auto"
+        ).geom_point(mapping=aes(size="size"), backend="shape")
+    return cases
+
+
+def run(sizes: list[int], repeat: int, node_limit: int) -> list[dict]:
+    results = []
+
+    def record(case: str, n: int, seconds: float, **extra) -> None:
+        results.append(dict(case=case, rows=n, seconds=seconds, **extra))
+        print(f"{case:>24} {n:>9} rows {seconds * 1000:>10.2f} ms", flush=True)
+
+    for n in sizes:
+        data = make_data(n)
+
+        seconds, plot = best_of(repeat, lambda: FuPlot(data, aes("x", "y")))
+        record("FuPlot.__init__", n, seconds)
+
+        def scale():
+            plot.scale_index.invalidate()
+            plot.mapping_scales = None
+            plot._auto_scale_mappings(aes("x", "y", size="size"))
+
+        record("_auto_scale_mappings", n, best_of(repeat, scale)[0])
+
+        seconds, _ = best_of(repeat, lambda: fusionize_array(data["y"]))
+        record("fusionize_array", n, seconds)
+
+        for case, plot in geom_cases(data, n <= node_limit).items():
+            seconds, _ = best_of(repeat, plot._resolve)
+            record(f"{case}.resolve", n, seconds)
+
+            seconds, text = best_of(repeat, lambda: serialize(plot))
+            record(f"{case}.render", n, seconds, bytes=len(text.encode()))
+
+            with without_templates():
+                seconds, text = best_of(repeat, lambda: serialize(plot))
+            record(f"{case}.render_pysion", n, seconds, bytes=len(text.encode()))
+
+            # repr alone, over an already built composition
+            comp = Composition()
+            tools = list(plot._iter_layers())
+            comp.add_tools(*(tools + plot._render_merges(tools, "chain", comp)))
+            record(f"{case}.repr", n, best_of(repeat, lambda: repr(comp))[0])
+
+            seconds, _ = best_of(repeat, lambda: plot.render_to(io.StringIO()))
+            record(f"{case}.render_to", n, seconds)
+
+            with tempfile.TemporaryDirectory() as tmp:
+                path = Path(tmp) / "comp.setting.gz"
+                seconds, _ = best_of(repeat, lambda: plot.render_to(path))
+                record(f"{case}.render_to_gzip", n, seconds, bytes=path.stat().st_size)
+
+    return results
+
+
+def commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--node-limit",
+        type=int,
+        default=10**5,
+        help="largest size for geoms that emit one node per row",
+    )
+    parser.add_argument("--output", type=Path, default=Path("bench_results.json"))
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.repeat, args.node_limit)
+
+    report = dict(
+        commit=commit(),
+        python=platform.python_version(),
+        numpy=np.__version__,
+        pandas=pd.__version__,
+        results=results,
+    )
+    args.output.write_text(json.dumps(report, indent=2))
+    print(f"Results written to {args.output}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,2 +1,5 @@
 from .fuplot import FuPlot, aes
 from pysion.color import RGBA
+from .batch import render_many
+from .cache import RenderCache
+from .budget import GraphBudget
@@ -0,0 +1,102 @@
+from .serialize import BezierSpline
+from .geometry import rounded
+from pysion import Tool
+from numpy import ndarray
+import numpy as np
+
+"""Helpers for the "frame" aesthetic, which animates a single node structure over
+time with keyframed splines instead of rendering one plot per frame."""
+
+
+def frame_codes(frames) -> tuple[ndarray, ndarray]:
+    """Returns the sorted unique frame values and each row's index into them."""
+
+    levels, codes = np.unique(np.asarray(frames), return_inverse=True)
+
+    return levels, codes.ravel()
+
+
+def entity_codes(entities) -> tuple[ndarray, ndarray]:
+    """Returns unique entities in order of first appearance and each row's index
+    into them."""
+
+    entities = np.asarray(entities)
+    _, first, codes = np.unique(entities, return_index=True, return_inverse=True)
+
+    # renumber so entities keep the order in which they first show up
+    order = np.argsort(first, kind="stable")
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+
+    return entities[np.sort(first)], rank[codes.ravel()]
+
+
+def occurrence_codes(frames: ndarray) -> ndarray:
+    """For data without an entity column: numbers rows by order of occurrence within
+    their frame, so the nth row of every frame is the same entity."""
+
+    order = np.argsort(frames, kind="stable")
+    sorted_frames = frames[order]
+
+    starts = np.r_[0, np.flatnonzero(np.diff(sorted_frames)) + 1]
+    counts = np.diff(np.r_[starts, len(frames)])
+
+    occurrence = np.empty(len(frames), dtype=np.intp)
+    occurrence[order] = np.arange(len(frames)) - np.repeat(starts, counts)
+
+    return occurrence
+
+
+def frame_matrix(
+    frames: ndarray, entities: ndarray, values: ndarray, n_frames: int, n_entities: int
+) -> ndarray:
+    """Spreads long format values into a frames x entities matrix. Entities missing
+    from a frame hold their closest known value, forward first, then backward."""
+
+    matrix = np.full((n_frames, n_entities), np.nan)
+    matrix[frames, entities] = values
+
+    return _fill_gaps(matrix)
+
+
+def _fill_gaps(matrix: ndarray) -> ndarray:
+    rows = np.arange(matrix.shape[0])[:, None]
+    known = ~np.isnan(matrix)
+
+    # forward fill
+    last = np.maximum.accumulate(np.where(known, rows, 0), axis=0)
+    filled = np.take_along_axis(matrix, last, axis=0)
+
+    # backward fill what's still missing at the start
+    known = ~np.isnan(filled)
+    first = np.where(known, rows, matrix.shape[0] - 1)
+    first = np.minimum.accumulate(first[::-1], axis=0)[::-1]
+
+    return np.take_along_axis(filled, first, axis=0)
+
+
+def keyframe_times(n_frames: int, frame_duration: int) -> ndarray:
+    return np.arange(n_frames) * frame_duration
+
+
+def animate_input(
+    tool: Tool,
+    input: str,
+    times: ndarray,
+    values: ndarray,
+    position: tuple[int, int],
+    precision: int | None = None,
+) -> BezierSpline | None:
+    """Connects a tool's input to a spline with one key per frame. Inputs that never
+    change get a plain value instead, and no spline is returned. With precision,
+    values are rounded to that many decimals."""
+
+    values = rounded(values, precision)
+    if np.all(values == values[0]):
+        tool.add_inputs(**{input: float(values[0])})
+        return None
+
+    spline = BezierSpline(f"{tool.name}{input}", times, values, position)
+    tool.add_source_input(input, spline.name, "Value")
+
+    return spline
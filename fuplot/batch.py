@@ -0,0 +1,150 @@
+from pandas import DataFrame, Index
+from concurrent.futures import ProcessPoolExecutor
+from numpy import ndarray
+from pathlib import Path
+from typing import Callable, Hashable, TYPE_CHECKING
+import numpy as np
+import re
+import tempfile
+
+if TYPE_CHECKING:
+    from .fuplot import FuPlot
+
+"""Rendering of many plots at once, one per group of a DataFrame, in a process pool."""
+
+
+def render_many(
+    data: DataFrame,
+    by: str | list[str],
+    build: Callable[[DataFrame], "FuPlot"],
+    directory: str | Path,
+    max_workers: int | None = None,
+    merge: str = "chain",
+    suffix: str = ".setting",
+) -> list[Path]:
+    """Splits data by the "by" column(s) and renders one plot per group to a file in
+    directory, named after the group key. Keys that would get the same file name, like
+    "a b" and "a_b", are told apart by a numbered suffix. build receives each group's
+    DataFrame and must return a FuPlot with its geoms already added. It runs in worker
+    processes, so it has to be a module level function.
+
+    Fixed width columns are shared with the workers through memory mapped files
+    instead of being pickled for every task. Groups are processed in sorted key order
+    and the returned paths follow that same order."""
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    groups: dict[Hashable, ndarray] = data.groupby(by, sort=True).indices
+
+    shared_columns = [c for c in data.columns if _is_fixed_width(data[c])]
+    other_columns = [c for c in data.columns if c not in shared_columns]
+
+    with tempfile.TemporaryDirectory(prefix="fuplot-") as tmp:
+        layout = _share_columns(data, shared_columns, Path(tmp))
+
+        tasks = [
+            _GroupTask(
+                positions=positions,
+                index=data.index[positions],
+                others=data.iloc[positions][other_columns],
+                columns=list(data.columns),
+                path=directory / f"{name}{suffix}",
+            )
+            for name, positions in zip(_file_names(groups), groups.values())
+        ]
+
+        with ProcessPoolExecutor(
+            max_workers, initializer=_attach_columns, initargs=(layout,)
+        ) as executor:
+            paths = list(
+                executor.map(
+                    _render_group, tasks, [build] * len(tasks), [merge] * len(tasks)
+                )
+            )
+
+    return paths
+
+
+class _GroupTask:
+    __slots__ = ("positions", "index", "others", "columns", "path")
+
+    def __init__(
+        self,
+        positions: ndarray,
+        index: Index,
+        others: DataFrame,
+        columns: list[str],
+        path: Path,
+    ) -> None:
+        self.positions = positions
+        self.index = index
+        self.others = others
+        self.columns = columns
+        self.path = path
+
+
+# columns memory mapped in each worker process
+_SHARED: dict[str, ndarray] = {}
+
+
+def _is_fixed_width(values) -> bool:
+    # only numpy dtypes: nullable extension dtypes (Int64, Float64, boolean) come out
+    # of to_numpy() as objects, which np.load can't memory map
+    return isinstance(values.dtype, np.dtype) and values.dtype.kind in "biufcmM"
+
+
+def _share_columns(
+    data: DataFrame, columns: list[str], directory: Path
+) -> dict[str, Path]:
+    layout: dict[str, Path] = {}
+    for i, column in enumerate(columns):
+        path = directory / f"{i}.npy"
+        np.save(path, data[column].to_numpy())
+        layout[column] = path
+
+    return layout
+
+
+def _attach_columns(layout: dict[str, Path]) -> None:
+    _SHARED.clear()
+    for column, path in layout.items():
+        _SHARED[column] = np.load(path, mmap_mode="r")
+
+
+def _render_group(task: _GroupTask, build: Callable, merge: str) -> Path:
+    # only this group's rows are ever copied out of the shared columns
+    columns = {
+        c: _SHARED[c][task.positions] if c in _SHARED else task.others[c].array
+        for c in task.columns
+    }
+    frame = DataFrame(columns, index=task.index, columns=task.columns)
+
+    build(frame).render_to(task.path, merge)
+
+    return task.path
+
+
+def _file_names(keys) -> list[str]:
+    """A distinct file name for every key, in order. Names are compared ignoring case,
+    for case insensitive file systems."""
+
+    names: list[str] = []
+    used: set[str] = set()
+    for key in keys:
+        name = base = _slug(key)
+        n = 1
+        while name.casefold() in used:
+            n += 1
+            name = f"{base}_{n}"
+        used.add(name.casefold())
+        names.append(name)
+
+    return names
+
+
+def _slug(key: Hashable) -> str:
+    if isinstance(key, tuple):
+        key = "_".join(str(k) for k in key)
+
+    return re.sub(r"[^\w\-.]+", "_", str(key)).strip("_") or "group"
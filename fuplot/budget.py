@@ -0,0 +1,56 @@
+from dataclasses import dataclass
+from numpy import ndarray
+import numpy as np
+
+"""Guardrails on the size of the node graphs geoms produce."""
+
+
+# typical serialized size of a node, and of a published polyline point
+NODE_BYTES = 450
+POINT_BYTES = 60
+
+
+@dataclass
+class GraphBudget:
+    """Limits on the node count and comp text size of any single geom. A geom that
+    would go over budget switches to a cheaper rendering strategy before rendering,
+    and FuPlot prints a warning with its estimate."""
+
+    max_nodes: int | None = None
+    max_bytes: int | None = None
+
+    def max_items(self, fixed_bytes: int, item_bytes: int) -> int | None:
+        """Largest number of per-row items (nodes or points) that fit in the byte
+        budget, on top of a fixed cost."""
+
+        if self.max_bytes is None:
+            return None
+
+        return max((self.max_bytes - fixed_bytes) // item_bytes, 1)
+
+    def exceeded(self, nodes: int, n_bytes: int) -> bool:
+        if self.max_nodes is not None and nodes > self.max_nodes:
+            return True
+        if self.max_bytes is not None and n_bytes > self.max_bytes:
+            return True
+
+        return False
+
+
+def thin(
+    x: ndarray, y: ndarray, max_points: int, resolution: tuple[int, int]
+) -> ndarray:
+    """Returns sorted indices of at most max_points points. Points falling on the same
+    pixel are dropped first, as they're indistinguishable anyway. If that's not
+    enough, what's left is subsampled evenly."""
+
+    px = np.round(x * resolution[0]).astype(np.int64)
+    py = np.round(y * resolution[1]).astype(np.int64)
+
+    _, kept = np.unique(px * (resolution[1] + 1) + py, return_index=True)
+    kept.sort()
+
+    if len(kept) > max_points:
+        kept = kept[np.linspace(0, len(kept) - 1, max_points).astype(np.intp)]
+
+    return kept
@@ -0,0 +1,132 @@
+from .serialize import Loader
+from pysion import Tool, Macro
+from pandas import DataFrame
+from pandas.util import hash_pandas_object
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+import hashlib
+import os
+import pickle
+import tempfile
+
+"""Caching of rendered geoms, so re-rendering a plot only rebuilds what changed."""
+
+
+class RenderCache:
+    """LRU cache of rendered geoms, keyed by a hash of everything that goes into
+    rendering them: geom type and index, style parameters, mapping, the mapped data
+    columns, scales, plot dimensions and resolution.
+
+    If a path is passed, entries are loaded from it on creation and saved back to it
+    after every render. The file is read with pickle, which can run arbitrary code, so
+    only pass a path to a cache file you trust, never one from someone else.
+
+    Rasterized geoms load images that may live in the temporary directory. An entry
+    whose images are gone is dropped and counted as a miss."""
+
+    def __init__(self, maxsize: int = 128, path: str | Path | None = None) -> None:
+        self.maxsize = maxsize
+        self.path = Path(path).expanduser() if path else None
+
+        self.hits = 0
+        self.misses = 0
+
+        self._entries: OrderedDict[str, Tool | Macro] = OrderedDict()
+
+        if self.path and self.path.exists():
+            with open(self.path, "rb") as f:
+                self._entries = pickle.load(f)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __repr__(self) -> str:
+        return (
+            f"RenderCache(size={len(self)}, maxsize={self.maxsize}, "
+            f"hits={self.hits}, misses={self.misses})"
+        )
+
+    def get(self, key: str) -> Tool | Macro | None:
+        rendered = self._entries.get(key)
+        if rendered is not None and not _files_exist(rendered):
+            del self._entries[key]
+            rendered = None
+        if rendered is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return rendered
+
+    def put(self, key: str, rendered: Tool | Macro) -> None:
+        self._entries[key] = rendered
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def save(self) -> None:
+        """Writes the cache to its path, if it has one."""
+
+        if self.path is None:
+            return
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(self._entries, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def key(
+        geom: type,
+        index: int,
+        params: dict[str, Any],
+        data: DataFrame,
+        mapping: dict[str, str],
+        mapping_scales: dict[str, tuple[float, float]],
+        width: float,
+        height: float,
+        resolution: tuple[int, int],
+    ) -> str:
+        mapped = {k: v for k, v in mapping.items() if v is not None}
+        columns = list(dict.fromkeys(mapped.values()))
+
+        h = hashlib.sha256()
+        h.update(
+            repr(
+                (
+                    geom.__qualname__,
+                    index,
+                    sorted(params.items()),
+                    sorted(mapped.items()),
+                    sorted(
+                        (k, mapping_scales[k]) for k in mapped if k in mapping_scales
+                    ),
+                    width,
+                    height,
+                    resolution,
+                )
+            ).encode()
+        )
+        h.update(hash_pandas_object(data[columns], index=False).to_numpy().tobytes())
+
+        return h.hexdigest()
+
+
+def _files_exist(tool: Tool | Macro) -> bool:
+    """Whether every image the Loaders in a rendered geom read is still on disk."""
+
+    if isinstance(tool, Loader):
+        return Path(tool.filename).exists()
+    if isinstance(tool, Macro):
+        return all(_files_exist(t) for t in tool.tools)
+
+    return True
@@ -0,0 +1,81 @@
+from pysion import Tool, Macro
+
+"""Plot controls: a geom's width, height and center as sliders on its macro. The geom
+is rendered as usual, then scaled by a single sTransform that reads the controls
+through expressions, so the plot can be resized, moved and animated in Fusion without
+regenerating it. No row of data is touched, so the comp doesn't grow with them."""
+
+
+# a Custom tool is only used to hold the values of the controls
+CONTROLS = dict(
+    width=("NumberIn1", "Plot Width"),
+    height=("NumberIn2", "Plot Height"),
+    size=("NumberIn3", "Size Scale"),
+    center=("PointIn1", "Plot Center"),
+)
+
+
+def controls_node(
+    name: str, width: float, height: float, position: tuple[int, int] = (0, 0)
+) -> Tool:
+    return Tool("Custom", name, position).add_inputs(
+        **{
+            CONTROLS["width"][0]: width,
+            CONTROLS["height"][0]: height,
+            CONTROLS["size"][0]: 1,
+            CONTROLS["center"][0]: (0.5, 0.5),
+        }
+    )
+
+
+def control_ref(node: Tool, control: str) -> str:
+    """Expression reading one of the node's controls."""
+
+    return f"{node.name}.{CONTROLS[control][0]}"
+
+
+def plot_transform(
+    name: str,
+    input: Tool,
+    node: Tool,
+    width: float,
+    height: float,
+    resolution: tuple[int, int],
+    position: tuple[int, int] = (0, 0),
+) -> Tool:
+    """sTransform that takes shapes laid out in a plot of width by height, centered on
+    the canvas, to the size and center set by the controls."""
+
+    ar = resolution[0] / resolution[1]
+    center = control_ref(node, "center")
+
+    return (
+        Tool("sTransform", name, position)
+        .add_expression_input("XSize", f"{control_ref(node, 'width')}/{width!r}")
+        .add_expression_input("YSize", f"{control_ref(node, 'height')}/{height!r}")
+        .add_expression_input("XOffset", f"{center}.X-0.5")
+        .add_expression_input("YOffset", f"({center}.Y-0.5)/{ar!r}")
+        .add_source_input("Input", input.name, input.output)
+    )
+
+
+def keep_proportions(shape: Tool, node: Tool, width: float, height: float) -> Tool:
+    """Counters the plot transform's stretching on the shape every instance is made
+    from, so instances keep their proportions, and scales it by the size control."""
+
+    size = control_ref(node, "size")
+    w, h = control_ref(node, "width"), control_ref(node, "height")
+
+    return shape.add_expression_input(
+        "Width", f"{size}*{width!r}/{w}"
+    ).add_expression_input("Height", f"{size}*{height!r}/{h}")
+
+
+def publish_controls(macro: Macro, node: Tool, controls: list[str]) -> Macro:
+    """Publishes the node's controls on the macro, where they can be animated."""
+
+    for control in controls:
+        input, pretty_name = CONTROLS[control]
+        macro.add_input(node, input, pretty_name)
+
+    return macro
@@ -0,0 +1,182 @@
+from numpy import ndarray
+import heapq
+import numpy as np
+
+"""Downsampling algorithms for lines with more points than the canvas can show.
+Every function takes coordinates in path order and returns the sorted indices of the
+points to keep, so the same selection can be applied to any other aesthetic. "minmax"
+works in pixel columns, so it needs the path to be sorted by x."""
+
+
+DECIMATION_METHODS = ("lttb", "minmax", "rdp")
+
+
+def decimate(
+    x: ndarray,
+    y: ndarray,
+    method: str,
+    max_points: int | None = None,
+    n_columns: int | None = None,
+) -> ndarray:
+    """Dispatches to one of the decimation methods. n_columns is the number of pixel
+    columns the line spans, used by "minmax" and as the default point budget."""
+
+    if method not in DECIMATION_METHODS:
+        raise ValueError(
+            f'Invalid decimation method "{method}". Use one of {DECIMATION_METHODS}.'
+        )
+
+    if method == "minmax":
+        # minmax keeps up to 4 points per column
+        if max_points:
+            budget = max(max_points // 4, 1)
+            n_columns = min(n_columns, budget) if n_columns else budget
+        return minmax(x, y, n_columns if n_columns else len(x))
+
+    if not max_points:
+        max_points = n_columns if n_columns else len(x)
+
+    if method == "lttb":
+        return lttb(x, y, max_points)
+
+    return rdp(x, y, max_points)
+
+
+def lttb(x: ndarray, y: ndarray, n_out: int) -> ndarray:
+    """Largest-Triangle-Three-Buckets: keeps the first and last points and, for each
+    of n_out - 2 equal-count buckets, the point forming the largest triangle with the
+    previously kept point and the average of the next bucket."""
+
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # n_out - 2 inner buckets over [1, n - 1), the last point being its own bucket
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    edges = np.append(edges, n)
+
+    kept = np.empty(n_out, dtype=np.intp)
+    kept[0], kept[-1] = 0, n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = edges[i + 1], edges[i + 2]
+
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        kept[i + 1] = a
+
+    return kept
+
+
+def minmax(x: ndarray, y: ndarray, n_columns: int) -> ndarray:
+    """Splits the x range in n_columns equal-width columns (usually one per pixel) and
+    keeps the first, last, lowest and highest point of each one. The decimated line
+    rasterizes to the same pixels as the original one."""
+
+    n = len(x)
+    if n <= 4 * n_columns:
+        return np.arange(n)
+
+    x_range = x[-1] - x[0]
+    if x_range == 0:
+        column = np.zeros(n, dtype=np.intp)
+    else:
+        column = ((x - x[0]) * (n_columns / x_range)).astype(np.intp)
+        column = np.minimum(column, n_columns - 1)
+
+    # x is sorted, so every column is a contiguous run of points
+    starts = np.r_[0, np.flatnonzero(np.diff(column)) + 1]
+    counts = np.diff(np.r_[starts, n])
+    ends = starts + counts - 1
+    group = np.repeat(np.arange(len(starts)), counts)
+
+    is_min = np.flatnonzero(y == np.repeat(np.minimum.reduceat(y, starts), counts))
+    is_max = np.flatnonzero(y == np.repeat(np.maximum.reduceat(y, starts), counts))
+
+    # first occurrence of the extreme value in each column
+    argmin = is_min[np.unique(group[is_min], return_index=True)[1]]
+    argmax = is_max[np.unique(group[is_max], return_index=True)[1]]
+
+    return np.unique(np.concatenate((starts, ends, argmin, argmax)))
+
+
+def rdp(x: ndarray, y: ndarray, n_out: int, tolerance: float = 0.5) -> ndarray:
+    """Ramer-Douglas-Peucker with a point budget: segments are split at their
+    farthest point, largest deviation first, until n_out points are kept or no point
+    deviates more than tolerance from the simplified line."""
+
+    n = len(x)
+    if n_out >= n or n < 3:
+        return np.arange(n)
+
+    kept = [0, n - 1]
+    heap: list[tuple[float, int, int, int]] = []
+
+    def push(start: int, end: int) -> None:
+        if end - start < 2:
+            return
+        split, distance = _farthest_point(x, y, start, end)
+        if distance > tolerance:
+            heapq.heappush(heap, (-distance, start, end, split))
+
+    push(0, n - 1)
+    while heap and len(kept) < n_out:
+        _, start, end, split = heapq.heappop(heap)
+        kept.append(split)
+        push(start, split)
+        push(split, end)
+
+    return np.sort(np.array(kept, dtype=np.intp))
+
+
+def _farthest_point(x: ndarray, y: ndarray, start: int, end: int) -> tuple[int, float]:
+    dx = x[end] - x[start]
+    dy = y[end] - y[start]
+    seg_x = x[start + 1 : end] - x[start]
+    seg_y = y[start + 1 : end] - y[start]
+
+    norm = np.hypot(dx, dy)
+    if norm == 0:
+        distances = np.hypot(seg_x, seg_y)
+    else:
+        distances = np.abs(dx * seg_y - dy * seg_x) / norm
+
+    i = int(np.argmax(distances))
+
+    return start + 1 + i, float(distances[i])
+
+
+def is_sorted(x: ndarray) -> bool:
+    """Whether x never decreases, as "minmax" needs."""
+
+    return bool(np.all(x[1:] >= x[:-1]))
+
+
+def decimation_error(x: ndarray, y: ndarray, kept: ndarray) -> float:
+    """Largest distance between the full line and the decimated one, in the same
+    units as y. Lines sorted by x are compared vertically, other paths point by point,
+    at the same distance along the path."""
+
+    if len(kept) == len(x):
+        return 0.0
+
+    if is_sorted(x):
+        return float(np.max(np.abs(y - np.interp(x, x[kept], y[kept]))))
+
+    t = np.r_[0, np.cumsum(np.hypot(np.diff(x), np.diff(y)))]
+
+    return float(
+        np.max(
+            np.hypot(
+                x - np.interp(t, t[kept], x[kept]), y - np.interp(t, t[kept], y[kept])
+            )
+        )
+    )
@@ -1,16 +1,36 @@
 from typing import Protocol
-from pandas import DataFrame
+from pandas import DataFrame, Timestamp
+from numpy import datetime64
 from .style import COLORS
 from .geom_line import GeomLine
 from .geom_point import GeomPoint
 from .geom_col import GeomCol
+from .geom_bin import GeomHistogram, GeomBin2d, GeomHex
+from .scales import ScaleIndex, merge_range
+from .fusionize import is_categorical, resolution_precision
+from .sources import ChunkedSource, reduce_source
+from .serialize import CompWriter, open_output, finish_output, output_compression
+from .cache import RenderCache
+from .profiling import Profiler, RenderProfile, NULL_PROFILER
+from .budget import GraphBudget
+from .prepare import prepare_data, NA_POLICIES
+from .geometry import count_nodes
 from pysion import Tool, Macro, RGBA, Composition
-from dataclasses import dataclass
-import pyperclip
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Iterator, TextIO
+import copy
 
 
 # GEOMS ========================================
 class Geom(Protocol):
+    # how rows of a ChunkedSource are reduced while streaming, see sources.REDUCTIONS
+    chunk_reduction: str | None
+    # aesthetics that must be mapped
+    required_aes: tuple[str, ...]
+    # whether missing values can break the geom, with the "break" NaN policy
+    na_breaks: bool
+
     @property
     def mapping(self) -> dict[str, str]:
         pass
@@ -19,9 +39,43 @@ class Geom(Protocol):
     def name(self) -> str:
         pass
 
-    def render(self, width: float, height: float, resolution: tuple[int, int]) -> Tool:
+    def estimate_nodes(self) -> int:
+        pass
+
+    def estimate_bytes(self) -> int:
+        pass
+
+    def fit_budget(self, budget: GraphBudget) -> str | None:
         pass
 
+    def render(
+        self,
+        width: float,
+        height: float,
+        mapping_scales: dict[str, tuple[float, float]],
+        resolution: tuple[int, int],
+    ) -> Tool | Macro:
+        pass
+
+
+@dataclass(frozen=True)
+class Layer:
+    """Immutable record of a geom added to a plot. Geoms are only built from
+    their layers, with resolved data and scales, when the plot is rendered."""
+
+    geom: type
+    data: DataFrame | None = None
+    mapping: dict[str, str] | None = None
+    params: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class _LayerOutput:
+    """What merges connect to: a layer's name and output, without its tools."""
+
+    name: str
+    output: str
+
 
 def aes(x: str | None = None, y: str | None = None, **kwargs) -> dict[str, str | None]:
     """The aes() function passes data as a dict to FuPlot and geoms' "mapping" argument.
@@ -57,17 +111,42 @@ class FuPlot:
     width: float = 0.75
     height: float = 0.75
     resolution: tuple[int, int] = (1920, 1080)
+    frame_duration: int = 24
+    # decimals coordinates are written with: full precision if None, or a tenth of a
+    # pixel at the plot's resolution if "auto"
+    precision: int | str | None = None
+    # rows with missing or infinite values: "drop" them, "clip" infinite values to
+    # the column's range, or "break" lines on them, see prepare.prepare_data()
+    na_policy: str = "drop"
 
     def __post_init__(self) -> None:
         # check if mappings are valid:
         check_mappings(self.mapping, self.data)
+        self._decimals()
+
+        if self.na_policy not in NA_POLICIES:
+            raise ValueError(
+                f'Invalid NaN policy "{self.na_policy}". Use one of {NA_POLICIES}.'
+            )
 
+        # geoms are recorded as layers and only built when rendering
+        self.layers: tuple[Layer, ...] = ()
         self.geoms: list[Geom] = []
 
         self._set_defaults()
 
+        self.scale_index = ScaleIndex()
         self.mapping_scales: dict[str, tuple[float, float]] = None
-        self._auto_scale_mappings(self.mapping)
+        self.manual_scales: dict[str, tuple] = {}
+
+        # set to a RenderCache to only re-render geoms whose inputs have changed
+        self.render_cache: RenderCache | None = None
+
+        # set to a GraphBudget to cap the size of every geom's node graph
+        self.budget: GraphBudget | None = None
+
+        # report of the last render called with profile=True
+        self.last_profile: RenderProfile | None = None
 
         self.comp = Composition()
 
@@ -116,111 +195,457 @@ class FuPlot:
 
         return Macro("Axes", position=(0, -1)).add_tools(x_axis, y_axis, fill)
 
-    def _render_geoms(self) -> list[Tool]:
-        g: list[Tool] = []
+    def _resolve(self) -> None:
+        """Builds every geom from its layer, resolving data, mappings and scales."""
+
+        for layer in self.layers:
+            self._check_layer(layer)
+
+        self.mapping_scales = None
+        self._scan_sources()
+        self._auto_scale_mappings(self.mapping)
+
+        resolved = [self.pass_to_geom(l.data, l.mapping) for l in self.layers]
+        self._apply_manual_scales()
+        resolved = self._reduce_sources(resolved)
+        resolved = [
+            (prepare_data(data, mapping, self.na_policy, layer.geom.na_breaks), mapping)
+            for layer, (data, mapping) in zip(self.layers, resolved)
+        ]
+
+        self.geoms = []
+        for layer, (data, mapping) in zip(self.layers, resolved):
+            index = len(self.geoms) + 1
+            self.geoms.append(
+                layer.geom(
+                    data=data,
+                    mapping=mapping,
+                    index=index,
+                    frame_duration=self.frame_duration,
+                    precision=self._decimals(),
+                    **layer.params,
+                )
+            )
+
+        if self.budget is not None:
+            self._apply_budget()
+
+    def _decimals(self) -> int | None:
+        """Resolves precision into a number of decimals."""
+
+        if self.precision is None or isinstance(self.precision, int):
+            return self.precision
+        if self.precision == "auto":
+            return resolution_precision(self.resolution)
+
+        raise ValueError(
+            f'Invalid precision "{self.precision}". Use a number of decimals, "auto"'
+            " or None."
+        )
+
+    def _scan_sources(self) -> None:
+        """Computes the ranges of all the columns mapped from each chunked source in a
+        single pass over it."""
+
+        columns: dict[int, tuple[ChunkedSource, list[str]]] = {}
+        for data, mapping in [(None, None)] + [
+            (l.data, l.mapping) for l in self.layers
+        ]:
+            data = self.data if data is None else data
+            if not isinstance(data, ChunkedSource):
+                continue
+
+            mapping = self._merge_mapping(mapping) or {}
+            _, names = columns.setdefault(id(data), (data, []))
+            names.extend(v for v in mapping.values() if v is not None)
+
+        for data, names in columns.values():
+            missing = self.scale_index.missing(data, names)
+            if missing:
+                self.scale_index.update(data, data.ranges(missing))
+
+    def _reduce_sources(
+        self, resolved: list[tuple[DataFrame, dict[str, str]]]
+    ) -> list[tuple[DataFrame, dict[str, str]]]:
+        """Replaces chunked sources with the reduced data each geom will draw. Scales
+        must be final by now. Every source is read once for all the layers using it."""
+
+        resolved = list(resolved)
+        layers: dict[int, list[int]] = {}
+        for i, (data, _) in enumerate(resolved):
+            if isinstance(data, ChunkedSource):
+                layers.setdefault(id(data), []).append(i)
+
+        for indices in layers.values():
+            source = resolved[indices[0]][0]
+            reduced = reduce_source(
+                source,
+                [
+                    (self.layers[i].geom.chunk_reduction, resolved[i][1])
+                    for i in indices
+                ],
+                self.mapping_scales,
+                self.resolution,
+            )
+            for i, result in zip(indices, reduced):
+                resolved[i] = result
+
+        return resolved
+
+    def _apply_budget(self) -> None:
         for geom in self.geoms:
-            g.append(
-                geom.render(
-                    self.width, self.height, self.mapping_scales, self.resolution
+            nodes, n_bytes = geom.estimate_nodes(), geom.estimate_bytes()
+            if not self.budget.exceeded(nodes, n_bytes):
+                continue
+
+            estimate = f"{geom.name} would emit about {nodes} nodes ({n_bytes} bytes)"
+            strategy = geom.fit_budget(self.budget)
+            if strategy:
+                print(f"Warning: {estimate}, over budget. It was {strategy}.")
+            else:
+                print(
+                    f"Warning: {estimate}, over budget. There is no cheaper strategy"
+                    " for it, so it will be rendered as is."
                 )
+
+    def estimate(self) -> list[tuple[str, int, int]]:
+        """Estimates each geom's node count and comp text size in bytes, without
+        rendering anything. Budget strategies are taken into account."""
+
+        self._resolve()
+
+        return [(g.name, g.estimate_nodes(), g.estimate_bytes()) for g in self.geoms]
+
+    def _iter_layers(
+        self, profiler: Profiler = NULL_PROFILER
+    ) -> Iterator[Tool | Macro]:
+        """Yields the background, axes and every geom, rendering each one only when
+        it's requested. Geoms must have been resolved beforehand."""
+
+        yield self._render_background()
+        yield self._render_axes()
+
+        for layer, geom in zip(self.layers, self.geoms):
+            with profiler.geom(geom) as record:
+                rendered, cached = self._render_geom(layer, geom)
+                if record:
+                    record.cached = cached
+                    record.nodes = count_nodes(rendered)
+            yield rendered
+
+    def _render_geom(self, layer: Layer, geom: Geom) -> tuple[Tool | Macro, bool]:
+        """Renders a geom, going through the render cache if there is one. Also
+        returns whether the result came from the cache."""
+
+        if self.render_cache is None:
+            rendered = geom.render(
+                self.width, self.height, self.mapping_scales, self.resolution
             )
+            return rendered, False
+
+        key = RenderCache.key(
+            layer.geom,
+            geom.index,
+            dict(
+                layer.params,
+                frame_duration=self.frame_duration,
+                precision=self._decimals(),
+                budget=self.budget,
+            ),
+            geom.data,
+            geom.mapping,
+            self.mapping_scales,
+            self.width,
+            self.height,
+            self.resolution,
+        )
+
+        rendered = self.render_cache.get(key)
+        if rendered is not None:
+            return rendered, True
 
-        return g
+        rendered = geom.render(
+            self.width, self.height, self.mapping_scales, self.resolution
+        )
+        self.render_cache.put(key, rendered)
 
-    def _auto_scale_mappings(self, mapping: dict[str, str]) -> None:
+        return rendered, False
+
+    def _auto_scale_mappings(
+        self, mapping: dict[str, str], data: DataFrame | None = None
+    ) -> None:
         """Calculates max an min values for each variable that has been
-        associated with a mapping."""
+        associated with a mapping, merging them into the existing scales."""
+
+        if data is None:
+            data = self.data
 
         # First time it's run.
         if self.mapping_scales is None:
             self.mapping_scales = {}
 
-            if mapping:
-                for viz, var in mapping.items():
-                    if var is None:
-                        continue
-
-                    min_v = min(self.data[var])
-                    max_v = max(self.data[var])
-                    self.mapping_scales[viz] = (min_v, max_v)
-            return
-
         if not mapping:
             return
 
-        # Every time a geom is added.
         for viz, var in mapping.items():
             if var is None:
                 continue
 
-            if viz in self.mapping_scales:
-                min_v = min(min(self.data[var]), *self.mapping_scales[viz])
-                max_v = max(max(self.data[var]), *self.mapping_scales[viz])
-                self.mapping_scales[viz] = (min_v, max_v)
+            if isinstance(data, DataFrame):
+                categorical = is_categorical(data[var])
             else:
-                min_v = min(self.data[var])
-                max_v = max(self.data[var])
-                self.mapping_scales[viz] = (min_v, max_v)
+                # chunked sources store the levels they found while scanning
+                categorical = self.scale_index.has_levels(data, var)
+
+            if categorical:
+                # categorical scales hold levels instead of limits
+                levels = self.scale_index.levels(data, var)
+                if viz in self.mapping_scales:
+                    levels = tuple(dict.fromkeys((*self.mapping_scales[viz], *levels)))
+
+                self.mapping_scales[viz] = levels
+                continue
+
+            min_v, max_v = self.scale_index.range(data, var)
+
+            if viz in self.mapping_scales:
+                min_v, max_v = merge_range((min_v, max_v), self.mapping_scales[viz])
+
+            self.mapping_scales[viz] = (min_v, max_v)
+
+    def _apply_manual_scales(self) -> None:
+        """Overrides the scales derived from data with those set with scale_manual()."""
+
+        for viz, scale in self.manual_scales.items():
+            if viz in self.mapping_scales:
+                self.mapping_scales[viz] = tuple(
+                    auto if manual is None else manual
+                    for manual, auto in zip(scale, self.mapping_scales[viz])
+                )
+
+    def invalidate_scales(self, data: DataFrame | None = None) -> None:
+        """Discards cached column statistics so scales are recomputed on the next
+        render. Call this after modifying the plot's (or a geom's) data in place.
+        If data is passed, only that DataFrame's statistics are discarded."""
+
+        self.scale_index.invalidate(data)
+        self.mapping_scales = None
 
     def scale_manual(self, mapping: str, scale: tuple[float, float]):
-        pass
+        """Fixes the limits of an aesthetic's scale instead of deriving them from the
+        data. Date limits can be strings, datetime64 or Timestamps. A limit set to
+        None is still taken from the data."""
+
+        self.manual_scales[mapping] = tuple(
+            Timestamp(v) if isinstance(v, (str, datetime64)) else v for v in scale
+        )
+
+        return self
 
     @property
     def aspect_ratio(self) -> float:
         return self.resolution[0] / self.resolution[1]
 
-    def render(self) -> str:
-        tools: list[Tool | Macro] = []
-        merges: list[Tool] = []
-        geoms = self._render_geoms()
+    def render(
+        self,
+        merge: str = "chain",
+        profile: bool | Callable[[RenderProfile], None] = False,
+    ) -> str:
+        """Renders the plot and copies the resulting node tree to the clipboard.
+        Layers are joined by a linear chain of Merge nodes by default. Use merge="tree"
+        to join them with a balanced binary tree instead, which keeps graph depth at
+        O(log layers) with the exact same stacking order.
+        With profile=True, timings per phase and per geom are stored in last_profile
+        and logged to the "fuplot.profiling" logger. profile can also be a callback,
+        which receives the report."""
+
+        import pyperclip
+
+        profiler = self._profiler(profile)
+
+        with profiler.phase("resolve"):
+            self._resolve()
+            self.comp = Composition()
+
+        with profiler.phase("layers"):
+            tools: list[Tool | Macro] = list(self._iter_layers(profiler))
+
+        with profiler.phase("merges"):
+            merges = self._render_merges(tools, merge, self.comp)
+            self.comp.add_tools(*(tools + merges))
+
+        if self.render_cache is not None:
+            self.render_cache.save()
+
+        with profiler.phase("serialize"):
+            rendered_node_tree = repr(self.comp)
+        profiler.output(len(rendered_node_tree))
 
-        bg = self._render_background()
-        axes = self._render_axes()
+        self.last_profile = profiler.finish()
 
-        tools += [bg, axes]
-        tools += geoms
+        pyperclip.copy(rendered_node_tree)
+
+        print("Rendered node tree successfully copied to the clipboard.")
+
+        return rendered_node_tree
+
+    def render_to(
+        self,
+        output: str | Path | TextIO,
+        merge: str = "chain",
+        profile: bool | Callable[[RenderProfile], None] = False,
+        compression: str | None = None,
+    ) -> int:
+        """Renders the plot straight into a .setting or .comp file, without going
+        through the clipboard. Output can be a path, "-" for stdout, or any writable
+        text file object. Tools are written as they're rendered and files are replaced
+        atomically. Returns the number of characters written. See render() for merge
+        and profile.
+        Paths and stdout can be compressed, for archiving, with compression="gzip" or
+        "zstd". It's inferred from .gz and .zst suffixes if not given."""
+
+        profiler = self._profiler(profile)
+
+        if hasattr(output, "write"):
+            if compression is not None:
+                raise ValueError('Compression needs a path or "-" as output.')
+            written = self._write_comp(output, merge, profiler)
+        else:
+            file, tmp_path = open_output(
+                output, output_compression(output, compression)
+            )
+            success = False
+            try:
+                written = self._write_comp(file, merge, profiler)
+                success = True
+            finally:
+                finish_output(file, output, tmp_path, success)
+
+        profiler.output(written)
+        self.last_profile = profiler.finish()
+
+        return written
+
+    @staticmethod
+    def _profiler(profile: bool | Callable[[RenderProfile], None]) -> Profiler:
+        if not profile:
+            return NULL_PROFILER
+
+        return Profiler(profile if callable(profile) else None)
+
+    def _write_comp(
+        self, file: TextIO, merge: str, profiler: Profiler = NULL_PROFILER
+    ) -> int:
+        with profiler.phase("resolve"):
+            self._resolve()
+
+        # merges only need every layer's name and output, not its tools
+        outputs: list[_LayerOutput] = []
+        layers = self._iter_layers(profiler)
+
+        with CompWriter(file) as writer:
+            while True:
+                with profiler.phase("layers"):
+                    tool = next(layers, None)
+                if tool is None:
+                    break
+
+                with profiler.phase("serialize"):
+                    writer.write(tool)
+                outputs.append(_LayerOutput(tool.name, tool.output))
+                del tool
+
+            with profiler.phase("merges"):
+                merges = self._render_merges(outputs, merge, Composition())
+            with profiler.phase("serialize"):
+                writer.write(*merges)
+
+        if self.render_cache is not None:
+            self.render_cache.save()
+
+        return writer.chars_written
+
+    def _render_merges(
+        self, tools: list[Tool | Macro], merge: str, comp: Composition
+    ) -> list[Tool]:
+        if merge == "chain":
+            return self._render_merge_chain(tools, comp)
+        if merge == "tree":
+            return self._render_merge_tree(tools, comp)
+
+        raise ValueError(f'Invalid merge strategy "{merge}". Use "chain" or "tree".')
+
+    def _render_merge_chain(
+        self, tools: list[Tool | Macro], comp: Composition
+    ) -> list[Tool]:
+        merges: list[Tool] = []
 
         for i, tool in enumerate(tools):
             if i == 0:
                 continue
             if i == 1:
                 merges.append(
-                    self.comp.add_merge(f"Merge{i}", tools[i - 1], tool, (i - 1, 0))
+                    comp.add_merge(f"Merge{i}", tools[i - 1], tool, (i - 1, 0))
                 )
                 continue
-            merges.append(
-                self.comp.add_merge(f"Merge{i}", merges[i - 2], tool, (i - 1, 0))
-            )
+            merges.append(comp.add_merge(f"Merge{i}", merges[i - 2], tool, (i - 1, 0)))
 
-        self.comp.add_tools(*(tools + merges))
+        return merges
 
-        rendered_node_tree = repr(self.comp)
-        pyperclip.copy(rendered_node_tree)
+    def _render_merge_tree(
+        self, tools: list[Tool | Macro], comp: Composition
+    ) -> list[Tool]:
+        """Merges neighbouring layers pairwise, level by level. Since Merge's "over"
+        operation is associative, the result is identical to the merge chain's."""
 
-        print("Rendered node tree successfully copied to the clipboard.")
+        merges: list[Tool] = []
+        level: list[Tool | Macro] = list(tools)
+        depth = 0
+
+        while len(level) > 1:
+            next_level: list[Tool | Macro] = []
+
+            for i in range(0, len(level) - 1, 2):
+                merge = comp.add_merge(
+                    f"Merge{len(merges) + 1}",
+                    level[i],
+                    level[i + 1],
+                    (i // 2, depth),
+                )
+                merges.append(merge)
+                next_level.append(merge)
 
-        return rendered_node_tree
+            # an odd layer out goes up a level untouched, keeping its place on top
+            if len(level) % 2:
+                next_level.append(level[-1])
+
+            level = next_level
+            depth += 1
+
+        return merges
 
     def pass_to_geom(
         self, data: DataFrame, mapping: dict[str, str]
     ) -> tuple[DataFrame, dict[str, str]]:
         """Generalizes the passing of data and mapping to any geom."""
 
-        self._auto_scale_mappings(mapping)
-        # print(self.mapping_scales)
-
         if data is None:
             data = self.data
 
-        if mapping is None:
-            new_mapping = self.mapping
+        new_mapping = self._merge_mapping(mapping)
 
-            return data, new_mapping
+        # scales are cached per column, so rescaling with the full mapping is cheap.
+        self._auto_scale_mappings(new_mapping, data)
 
-        if self.mapping is None:
-            new_mapping = mapping
+        return data, new_mapping
 
-            return data, new_mapping
+    def _merge_mapping(self, mapping: dict[str, str] | None) -> dict[str, str] | None:
+        """Overrides the plot's mapping with a geom's."""
+
+        if mapping is None:
+            return self.mapping
+        if self.mapping is None:
+            return mapping
 
         new_mapping = {k: v for k, v in self.mapping.items()}
         for k, v in mapping.items():
@@ -228,7 +653,34 @@ class FuPlot:
                 continue
             new_mapping[k] = v
 
-        return data, new_mapping
+        return new_mapping
+
+    def _add_layer(
+        self,
+        geom: type,
+        data: DataFrame | None,
+        mapping: dict[str, str] | None,
+        **params,
+    ):
+        layer = Layer(geom, data, mapping, params)
+        self._check_layer(layer)
+        self.layers = self.layers + (layer,)
+
+        return self
+
+    def _check_layer(self, layer: Layer) -> None:
+        """Checks that the geom's mapping, merged with the plot's, covers its required
+        aesthetics with existing columns."""
+
+        data = self.data if layer.data is None else layer.data
+        mapping = self._merge_mapping(layer.mapping) or {}
+
+        check_mappings(mapping, data)
+        for aes in layer.geom.required_aes:
+            if mapping.get(aes) is None:
+                raise InvalidMapping(
+                    f'{layer.geom.__name__} requires the "{aes}" aesthetic to be mapped.'
+                )
 
     def geom_line(
         self,
@@ -236,13 +688,24 @@ class FuPlot:
         mapping: dict[str, str] = None,
         thickness: float = None,
         color: RGBA = None,
+        decimate: str | None = None,
+        max_points: int | None = None,
+        palette: tuple[RGBA, ...] | None = None,
+        backend: str = "polyline",
+        raster_file: str | Path | None = None,
     ):
-        data, mapping = self.pass_to_geom(data, mapping)
-
-        index = len(self.geoms) + 1
-        self.geoms.append(GeomLine(data, mapping, thickness, color, index))
-
-        return self
+        return self._add_layer(
+            GeomLine,
+            data,
+            mapping,
+            thickness=thickness,
+            color=color,
+            decimate=decimate,
+            max_points=max_points,
+            palette=palette,
+            backend=backend,
+            raster_file=raster_file,
+        )
 
     def geom_point(
         self,
@@ -253,47 +716,93 @@ class FuPlot:
         size: float | None = None,
         max_size: float = None,
         min_size: float = None,
+        backend: str = "mask",
+        max_points: int | None = None,
+        controls: bool = False,
+        raster_file: str | Path | None = None,
     ):
-        data, mapping = self.pass_to_geom(data, mapping)
-
-        index = len(self.geoms) + 1
-        self.geoms.append(
-            GeomPoint(
-                data=data,
-                mapping=mapping,
-                fill=fill,
-                opacity=opacity,
-                size=size,
-                max_size=max_size,
-                min_size=min_size,
-                index=index,
-            )
+        return self._add_layer(
+            GeomPoint,
+            data,
+            mapping,
+            fill=fill,
+            opacity=opacity,
+            size=size,
+            max_size=max_size,
+            min_size=min_size,
+            backend=backend,
+            max_points=max_points,
+            controls=controls,
+            raster_file=raster_file,
         )
 
-        return self
-
     def geom_col(
         self,
         data: DataFrame | None = None,
         mapping: dict[str, str] | None = None,
         fill: RGBA | None = None,
         spacing: float | None = None,
+        palette: tuple[RGBA, ...] | None = None,
+        controls: bool = False,
     ):
-        data, mapping = self.pass_to_geom(data, mapping)
-
-        index = len(self.geoms) + 1
+        return self._add_layer(
+            GeomCol,
+            data,
+            mapping,
+            fill=fill,
+            spacing=spacing,
+            palette=palette,
+            controls=controls,
+        )
 
-        self.geoms.append(
-            GeomCol(
-                data=data,
-                mapping=mapping,
-                fill=fill,
-                spacing=spacing,
-                index=index,
-            )
+    def geom_histogram(
+        self,
+        data: DataFrame | None = None,
+        mapping: dict[str, str] | None = None,
+        bins: int = 30,
+        fill: RGBA | None = None,
+        spacing: float | None = None,
+    ):
+        return self._add_layer(
+            GeomHistogram, data, mapping, bins=bins, fill=fill, spacing=spacing
         )
 
-        return self
+    def geom_bin2d(
+        self,
+        data: DataFrame | None = None,
+        mapping: dict[str, str] | None = None,
+        bins: int | tuple[int, int] = 30,
+        fill: RGBA | None = None,
+    ):
+        return self._add_layer(GeomBin2d, data, mapping, bins=bins, fill=fill)
+
+    def geom_hex(
+        self,
+        data: DataFrame | None = None,
+        mapping: dict[str, str] | None = None,
+        bins: int = 30,
+        fill: RGBA | None = None,
+    ):
+        return self._add_layer(GeomHex, data, mapping, bins=bins, fill=fill)
+
+    def copy(self, **changes) -> "FuPlot":
+        """Returns a variant of this plot sharing its data, layers and cached scale
+        statistics. Any of the plot's fields (data, mapping, width, height, resolution)
+        can be changed. Adding geoms to the copy doesn't affect the original plot."""
+
+        new = copy.copy(self)
+        for k, v in changes.items():
+            setattr(new, k, v)
+
+        if "data" in changes or "mapping" in changes:
+            check_mappings(new.mapping, new.data)
+
+        new.geoms = []
+        new.mapping_scales = None
+        new.manual_scales = dict(self.manual_scales)
+        new.comp = Composition()
+
+        return new
 
     def theme(self, background_color: RGBA = None, **kwargs):
         if background_color:
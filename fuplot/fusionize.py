@@ -1,42 +1,63 @@
-from pandas import Series
-from numpy import datetime64
+from pandas import Series, Timestamp, CategoricalDtype
+from pandas.api.types import is_datetime64_any_dtype, is_numeric_dtype
+from numpy import datetime64, ndarray
+import pandas as pd
+import numpy as np
 
 """This is where all of the functions that transform the data points in
 input values for Fusion that produce the visualizations live."""
 
+# fraction of a pixel coordinates are written to with an automatic precision
+SUBPIXEL = 10
+
 
 def fusionize(
-    values: list[int | float] | Series,
+    values: list[int | float] | Series | ndarray,
     scale_data: tuple[int | float, int | float] = None,
     scale_plot: tuple[float, float] = (0, 1),
 ) -> list[float]:
     """Normalizes values for Fusion canvases"""
-    if not scale_data:
-        min_data = min(values)
-        max_data = max(values)
-    else:
-        min_data = min(scale_data)
-        max_data = max(scale_data)
 
-    range_data = max_data - min_data
+    return fusionize_array(values, scale_data, scale_plot).tolist()
 
-    min_plot = min(scale_plot)
-    max_plot = max(scale_plot)
-    range_plot = max_plot - min_plot
 
-    return [range_plot * (v - min_data) / range_data + min_plot for v in values]
+def fusionize_array(
+    values: list[int | float] | Series | ndarray,
+    scale_data: tuple[int | float, int | float] = None,
+    scale_plot: tuple[float, float] = (0, 1),
+) -> ndarray:
+    """Vectorized version of fusionize(). Takes any array-like and returns a float64 array."""
+
+    if is_datetime64_any_dtype(values):
+        return _fusionize_date(values, scale_data, scale_plot)
+
+    if is_categorical(values):
+        return _fusionize_categorical(values, scale_data, scale_plot)
+
+    return _fusionize_continuous(values, scale_data, scale_plot)
+
+
+def is_categorical(values) -> bool:
+    """Anything that isn't a number or a date is treated as categorical."""
+
+    if not hasattr(values, "dtype"):
+        values = np.asarray(values)
+
+    return not (is_numeric_dtype(values) or is_datetime64_any_dtype(values))
 
 
 def _fusionize_continuous(
-    values: list[int | float] | Series,
+    values: list[int | float] | Series | ndarray,
     scale_data: tuple[int | float, int | float] = None,
     scale_plot: tuple[float, float] = (0, 1),
-) -> list[float]:
+) -> ndarray:
     """Normalizes continuous variables' values for Fusion."""
 
+    values = np.asarray(values, dtype=np.float64)
+
     if not scale_data:
-        min_data = min(values)
-        max_data = max(values)
+        min_data = np.nanmin(values)
+        max_data = np.nanmax(values)
     else:
         min_data = min(scale_data)
         max_data = max(scale_data)
@@ -47,36 +68,120 @@ def _fusionize_continuous(
     max_plot = max(scale_plot)
     range_plot = max_plot - min_plot
 
-    return [range_plot * (v - min_data) / range_data + min_plot for v in values]
+    # a constant variable has no range, so everything goes to the middle of the plot
+    if range_data == 0:
+        return np.full(values.shape, min_plot + range_plot / 2)
+
+    return range_plot * (values - min_data) / range_data + min_plot
 
 
 def _fusionize_date(
     date: Series,
     scale_data: tuple[datetime64 | str | None, datetime64 | str | None],
     scale_plot: tuple[float, float] = (0, 1),
-) -> list[float]:
+) -> ndarray:
     """Deals with date values before passing them on to the continuous variable function"""
-    ...
+
+    dates = pd.DatetimeIndex(date)
+    values = dates_to_float(dates)
+
+    if scale_data:
+        # open ended limits (None) fall back to the data's own
+        min_data, max_data = (date_to_float(d, dates.tz) for d in scale_data)
+        scale_data = (
+            np.nanmin(values) if np.isnan(min_data) else min_data,
+            np.nanmax(values) if np.isnan(max_data) else max_data,
+        )
+
+    return _fusionize_continuous(values, scale_data, scale_plot)
+
+
+def dates_to_float(dates: pd.DatetimeIndex) -> ndarray:
+    """Nanoseconds since the epoch, read straight off the dates' int64 view. Timezone
+    aware dates are measured in UTC, so they compare as instants. NaT becomes NaN."""
+
+    values = dates.asi8.astype(np.float64)
+    values[dates.isna()] = np.nan
+
+    return values
+
+
+def date_to_float(date: datetime64 | Timestamp | str | None, tz=None) -> float:
+    """Converts a single date, such as a scale limit, like dates_to_float(). Naive
+    dates are taken to be in the timezone tz of the data they're compared with."""
+
+    date = Timestamp(date)
+    if pd.isna(date):
+        return np.nan
+
+    if date.tzinfo is None and tz is not None:
+        date = date.tz_localize(tz)
+    elif date.tzinfo is not None and tz is None:
+        date = date.tz_convert(None)
+
+    return float(date.value)
+
+
+def _fusionize_categorical(
+    values: list[str] | Series | ndarray,
+    levels: tuple | None = None,
+    scale_plot: tuple[float, float] = (0, 1),
+) -> ndarray:
+    """Places every value at the position of its level. Values missing from the
+    levels become NaN."""
+
+    if levels is None:
+        levels = categorical_levels(values)
+
+    codes = categorical_codes(values, levels)
+    positions = fusionize_categorical_to_position(len(levels), scale_plot)
+
+    return np.where(codes >= 0, positions[codes], np.nan)
 
 
 def fusionize_categorical_to_position(
     n_values: int,
     scale_plot: tuple[float, float] = (0, 1),
-) -> list[float]:
-    """Maps categorical variable data points to Fusion continuous input values (such as position)."""
+) -> ndarray:
+    """Maps categorical variable data points to Fusion continuous input values (such as position).
+    Each value gets the center of one of n_values equal slots."""
     min_pos = min(scale_plot)
     range_pos = max(scale_plot) - min_pos
     step = range_pos / (n_values)
 
-    return [min_pos + (i - 1) * step for i in range(n_values)]
+    return min_pos + (np.arange(n_values) + 0.5) * step
 
 
 def _fusionize_categorical_to_categorical(
     values: list[int | float | str] | Series,
     ascending: bool = True,
-) -> list[float]:
-    """Maps categorical variable data points to Fusion discrete input values (such as a list of colors)."""
-    ...
+) -> ndarray:
+    """Maps categorical variable data points to Fusion discrete input values (such as a list of colors).
+    Returns every value's index into its sorted levels, to pick from a palette."""
+
+    return categorical_codes(values, categorical_levels(values, ascending))
+
+
+def categorical_levels(values, ascending: bool | None = True) -> ndarray:
+    """Unique values of a categorical variable, in scale order. Pandas categoricals
+    keep the order of their categories, other values are sorted. With ascending set
+    to None, values are kept in order of first appearance instead."""
+
+    if isinstance(getattr(values, "dtype", None), CategoricalDtype):
+        levels = pd.Categorical(values).categories.to_numpy()
+    else:
+        levels = pd.unique(pd.Series(values).dropna())
+        if ascending is not None:
+            levels = np.sort(levels)
+
+    return levels[::-1] if ascending is False else levels
+
+
+def categorical_codes(values, levels) -> ndarray:
+    """Every value's index into levels, or -1 if it isn't one of them. Hash based,
+    so it runs in linear time however many levels there are."""
+
+    return pd.Categorical(values, categories=levels).codes.astype(np.intp)
 
 
 # Helper dim to scale converters
@@ -88,3 +193,10 @@ def dim_to_scale(dim: float, center: float = 0.5) -> tuple[float, float]:
 
 def scale_to_dim(scale: tuple[float, float]) -> float:
     return scale[1] - scale[0]
+
+
+def resolution_precision(resolution: tuple[int, int], subpixel: int = SUBPIXEL) -> int:
+    """Decimals needed to place canvas coordinates within a subpixel-th of a pixel,
+    along the longest side of the canvas."""
+
+    return int(np.ceil(np.log10(max(resolution) * subpixel)))
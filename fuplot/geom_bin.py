@@ -0,0 +1,402 @@
+from .fusionize import fusionize_array, dim_to_scale
+from .geometry import tool_rows, merge_tools, ToolTemplate, Column
+from .budget import GraphBudget, NODE_BYTES
+from pysion import Tool, Macro, RGBA
+from pandas import DataFrame
+from numpy import ndarray
+import numpy as np
+
+"""Aggregated geoms: data is binned with NumPy before rendering, so the number of
+nodes depends on the number of bins instead of the number of rows."""
+
+
+class _GeomBinned:
+    """Shared rendering for binned geoms: one shape node per non-empty bin, all fed
+    into a single sMerge and sRender."""
+
+    shape = "sRectangle"
+    prefix = "GeomBin"
+    chunk_reduction = "bins"
+    required_aes = ("x", "y")
+    na_breaks = False
+    _dims = 2
+
+    def __init__(
+        self,
+        data: DataFrame,
+        mapping: dict[str, str],
+        bins: int | tuple[int, int] = 30,
+        fill: RGBA | None = None,
+        index: int = 1,
+        frame_duration: int = 24,
+        precision: int | None = None,
+    ) -> None:
+        self.data = data
+        self.mapping = mapping
+
+        # binning
+        self.bins = bins
+
+        # style
+        self.fill = fill if fill else RGBA()
+
+        # index
+        self.index = index
+
+        # serialization
+        self.precision = precision
+
+    @property
+    def name(self) -> str:
+        """Same name of the tool that outputs the final geom image"""
+
+        return f"{self.prefix}{self.index}"
+
+    @property
+    def n_bins(self) -> int:
+        nx, ny = self._bins_xy()
+        return nx * ny
+
+    def estimate_nodes(self) -> int:
+        """Upper bound of the number of nodes render() will emit."""
+
+        # one shape per bin, merge and render
+        return self.n_bins + 2
+
+    def estimate_bytes(self) -> int:
+        return self.estimate_nodes() * NODE_BYTES
+
+    def fit_budget(self, budget: GraphBudget) -> str | None:
+        """Lowers the number of bins so the geom fits the budget. Returns a description
+        of what was done."""
+
+        limits = [budget.max_items(2 * NODE_BYTES, NODE_BYTES)]
+        if budget.max_nodes is not None:
+            limits.append(max(budget.max_nodes - 2, 1))
+        max_bins = min(m for m in limits if m)
+
+        nx, ny = self._bins_xy()
+        ratio = min((max_bins / (nx * ny)) ** (1 / self._dims), 1)
+        original = self.bins
+
+        # rounding can leave a few bins too many
+        self.bins = self._scaled_bins(ratio)
+        while self.n_bins > max_bins and ratio > 0.01:
+            ratio *= 0.95
+            self.bins = original
+            self.bins = self._scaled_bins(ratio)
+
+        return f"reduced to {self.n_bins} bins"
+
+    def _bins_xy(self) -> tuple[int, int]:
+        if isinstance(self.bins, tuple):
+            return self.bins
+        return self.bins, self.bins
+
+    def _scaled_bins(self, ratio: float) -> int | tuple[int, int]:
+        nx, ny = self._bins_xy()
+        return max(int(nx * ratio), 1), max(int(ny * ratio), 1)
+
+    def _weights(self) -> ndarray | None:
+        if self.mapping.get("weight") is None:
+            return None
+        return np.asarray(self.data[self.mapping["weight"]], dtype=np.float64)
+
+    def _render_shapes(
+        self,
+        x: ndarray,
+        y: ndarray,
+        width: ndarray,
+        height: ndarray,
+        alpha: ndarray,
+        resolution: tuple[int, int],
+        **inputs,
+    ) -> Macro:
+        """Builds the geom from bin centers and sizes, all in canvas coordinates."""
+
+        # shape space is centered on the canvas and measured in canvas widths
+        ar = resolution[0] / resolution[1]
+
+        def build(name: str, pos: int, cx: float, cy: float, w, h, a) -> Tool:
+            return (
+                Tool(self.shape, name, (0, pos))
+                .add_inputs(
+                    Width=w,
+                    Height=h,
+                    Red=self.fill.red,
+                    Green=self.fill.green,
+                    Blue=self.fill.blue,
+                    Alpha=a,
+                    **inputs,
+                )
+                .add_inputs(**{'["Translate.X"]': cx, '["Translate.Y"]': cy})
+            )
+
+        template = ToolTemplate(
+            self.shape,
+            {
+                "Width": Column("w"),
+                "Height": Column("h"),
+                "Red": self.fill.red,
+                "Green": self.fill.green,
+                "Blue": self.fill.blue,
+                "Alpha": Column("a"),
+                **inputs,
+                '["Translate.X"]': Column("cx"),
+                '["Translate.Y"]': Column("cy"),
+            },
+            (0, Column("pos")),
+        )
+
+        shapes = tool_rows(
+            build,
+            template,
+            dict(
+                name=[f"{self.prefix}{self.index}Bin{i+1}" for i in range(len(x))],
+                pos=range(len(x)),
+                cx=x - 0.5,
+                cy=(y - 0.5) / ar,
+                w=width,
+                h=height / ar,
+                a=alpha,
+            ),
+            self.precision,
+        )
+
+        merge = merge_tools(f"{self.prefix}Merge{self.index}", shapes, (1, 0))
+
+        srender = (
+            Tool("sRender", f"{self.prefix}Render{self.index}", (2, 0))
+            .add_inputs(Width=resolution[0], Height=resolution[1])
+            .add_source_input("Input", merge.name, merge.output)
+        )
+
+        return Macro(self.name, type="group", position=(self.index, -1)).add_tools(
+            *shapes, merge, srender
+        )
+
+
+class GeomHistogram(_GeomBinned):
+    prefix = "GeomHistogram"
+    chunk_reduction = "histogram"
+    required_aes = ("x",)
+    _dims = 1
+
+    def __init__(
+        self,
+        data: DataFrame,
+        mapping: dict[str, str],
+        bins: int = 30,
+        fill: RGBA | None = None,
+        spacing: float | None = None,
+        index: int = 1,
+        frame_duration: int = 24,
+        precision: int | None = None,
+    ) -> None:
+        """Accepted mappings: x (mandatory), weight.
+        Counts rows in equal width bins over the x scale and draws one column per bin.
+        """
+        super().__init__(data, mapping, bins, fill, index, frame_duration, precision)
+        self.spacing = spacing if spacing else 0.05
+
+    def _bins_xy(self) -> tuple[int, int]:
+        return self.bins, 1
+
+    def _scaled_bins(self, ratio: float) -> int:
+        return max(int(self.bins * ratio), 1)
+
+    def render(
+        self,
+        width: float,
+        height: float,
+        mapping_scales: dict[str, tuple[int, int]],
+        resolution: tuple[int, int],
+    ) -> Macro:
+        x_scale = dim_to_scale(width)
+        fu_x = fusionize_array(
+            self.data[self.mapping["x"]], mapping_scales["x"], x_scale
+        )
+
+        index = _bin_index(fu_x, x_scale, self.bins)
+        index[np.isnan(fu_x)] = -1
+
+        counts = _bin_counts(index, self.bins, self._weights())
+        filled = np.flatnonzero(counts)
+
+        bin_width = width / self.bins
+        col_heights = counts[filled] / _peak(counts) * height
+        bottom = dim_to_scale(height)[0]
+
+        return self._render_shapes(
+            x=x_scale[0] + (filled + 0.5) * bin_width,
+            y=bottom + col_heights / 2,
+            width=np.full(len(filled), bin_width * (1 - self.spacing)),
+            height=col_heights,
+            alpha=np.full(len(filled), self.fill.alpha),
+            resolution=resolution,
+        )
+
+
+class GeomBin2d(_GeomBinned):
+    prefix = "GeomBin2d"
+
+    def __init__(
+        self,
+        data: DataFrame,
+        mapping: dict[str, str],
+        bins: int | tuple[int, int] = 30,
+        fill: RGBA | None = None,
+        index: int = 1,
+        frame_duration: int = 24,
+        precision: int | None = None,
+    ) -> None:
+        """Accepted mappings: x (mandatory), y (mandatory), weight.
+        Counts rows in a grid of rectangular bins over the x and y scales. Each bin's
+        opacity is proportional to its count."""
+        super().__init__(data, mapping, bins, fill, index, frame_duration, precision)
+
+    def render(
+        self,
+        width: float,
+        height: float,
+        mapping_scales: dict[str, tuple[int, int]],
+        resolution: tuple[int, int],
+    ) -> Macro:
+        nx, ny = self._bins_xy()
+        x_scale, y_scale = dim_to_scale(width), dim_to_scale(height)
+
+        fu_x = fusionize_array(
+            self.data[self.mapping["x"]], mapping_scales["x"], x_scale
+        )
+        fu_y = fusionize_array(
+            self.data[self.mapping["y"]], mapping_scales["y"], y_scale
+        )
+
+        flat = _bin_index(fu_x, x_scale, nx) * ny + _bin_index(fu_y, y_scale, ny)
+        flat[np.isnan(fu_x) | np.isnan(fu_y)] = -1
+        counts = _bin_counts(flat, nx * ny, self._weights())
+        filled = np.flatnonzero(counts)
+        ix, iy = np.divmod(filled, ny)
+
+        bin_width, bin_height = width / nx, height / ny
+
+        return self._render_shapes(
+            x=x_scale[0] + (ix + 0.5) * bin_width,
+            y=y_scale[0] + (iy + 0.5) * bin_height,
+            width=np.full(len(filled), bin_width),
+            height=np.full(len(filled), bin_height),
+            alpha=counts[filled] / _peak(counts) * self.fill.alpha,
+            resolution=resolution,
+        )
+
+
+class GeomHex(_GeomBinned):
+    shape = "sNGon"
+    prefix = "GeomHex"
+
+    def __init__(
+        self,
+        data: DataFrame,
+        mapping: dict[str, str],
+        bins: int = 30,
+        fill: RGBA | None = None,
+        index: int = 1,
+        frame_duration: int = 24,
+        precision: int | None = None,
+    ) -> None:
+        """Accepted mappings: x (mandatory), y (mandatory), weight.
+        Counts rows in pointy topped hexagonal bins, bins being the number of hexagons
+        across the plot's width. Each hexagon's opacity is proportional to its count."""
+        super().__init__(data, mapping, bins, fill, index, frame_duration, precision)
+
+    def _bins_xy(self) -> tuple[int, int]:
+        # a hexagon lattice has about 1.15 rows per column of the same size
+        return self.bins, int(np.ceil(self.bins * 2 / np.sqrt(3))) + 1
+
+    def _scaled_bins(self, ratio: float) -> int:
+        return max(int(self.bins * ratio), 1)
+
+    def render(
+        self,
+        width: float,
+        height: float,
+        mapping_scales: dict[str, tuple[int, int]],
+        resolution: tuple[int, int],
+    ) -> Macro:
+        ar = resolution[0] / resolution[1]
+        nx = self._bins_xy()[0]
+        x_scale, y_scale = dim_to_scale(width), dim_to_scale(height)
+
+        fu_x = fusionize_array(
+            self.data[self.mapping["x"]], mapping_scales["x"], x_scale
+        )
+        fu_y = fusionize_array(
+            self.data[self.mapping["y"]], mapping_scales["y"], y_scale
+        )
+
+        # hexagons must be regular on screen, so binning happens in canvas widths
+        x = fu_x - x_scale[0]
+        y = (fu_y - y_scale[0]) / ar
+
+        radius = width / (nx * np.sqrt(3))
+        dx, dy = np.sqrt(3) * radius, 3 * radius
+        ny = int(np.ceil(height / ar / dy)) + 1
+
+        # centers lie on two interleaved rectangular lattices: pick the closest one
+        ax, ay = np.rint(x / dx), np.rint(y / dy)
+        bx, by = np.floor(x / dx), np.floor(y / dy)
+        dist_a = (x - ax * dx) ** 2 + (y - ay * dy) ** 2
+        dist_b = (x - (bx + 0.5) * dx) ** 2 + (y - (by + 0.5) * dy) ** 2
+        on_b = dist_b < dist_a
+
+        with np.errstate(invalid="ignore"):
+            col = np.where(on_b, bx, ax).astype(np.intp).clip(0, nx)
+            row = np.where(on_b, by, ay).astype(np.intp).clip(0, ny)
+        flat = (on_b * (ny + 1) + row) * (nx + 1) + col
+        flat[np.isnan(x) | np.isnan(y)] = -1
+
+        counts = _bin_counts(flat, 2 * (ny + 1) * (nx + 1), self._weights())
+        filled = np.flatnonzero(counts)
+        lattice, rest = np.divmod(filled, (ny + 1) * (nx + 1))
+        row, col = np.divmod(rest, nx + 1)
+
+        center_x = (col + 0.5 * lattice) * dx + x_scale[0]
+        center_y = (row + 0.5 * lattice) * dy * ar + y_scale[0]
+
+        return self._render_shapes(
+            x=center_x,
+            y=center_y,
+            width=np.full(len(filled), 2 * radius),
+            height=np.full(len(filled), 2 * radius * ar),
+            alpha=counts[filled] / _peak(counts) * self.fill.alpha,
+            resolution=resolution,
+            Sides=6,
+        )
+
+
+def _bin_index(values: ndarray, scale: tuple[float, float], n_bins: int) -> ndarray:
+    """Index of the equal width bin every value falls in. Values on the upper edge
+    go in the last bin."""
+
+    with np.errstate(invalid="ignore"):
+        index = (values - scale[0]) * (n_bins / (scale[1] - scale[0]))
+        index = index.astype(np.intp)
+
+    return index.clip(0, n_bins - 1)
+
+
+def _bin_counts(index: ndarray, n_bins: int, weights: ndarray | None) -> ndarray:
+    """Sums of weights (or row counts) per bin. Rows with a negative index, which had
+    missing values, are left out."""
+
+    valid = index >= 0
+    if weights is not None:
+        weights = weights[valid]
+
+    return np.bincount(index[valid], weights=weights, minlength=n_bins)
+
+
+def _peak(counts: ndarray) -> float:
+    peak = counts.max() if len(counts) else 0
+
+    return peak if peak > 0 else 1
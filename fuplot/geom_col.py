@@ -1,18 +1,44 @@
-from .fusionize import fusionize, dim_to_scale, fusionize_categorical_to_position
+from .fusionize import fusionize_array, dim_to_scale, fusionize_categorical_to_position
+from .fusionize import categorical_codes, categorical_levels, is_categorical
+from .style import PALETTES, palette_colors
+from .animate import frame_codes, entity_codes, frame_matrix, keyframe_times
+from .animate import animate_input
+from .serialize import BezierSpline
+from .geometry import Geometry, tool_rows, rounded
+from .geometry import ToolTemplate, Column, Source, merge_tools
+from .controls import controls_node, plot_transform, publish_controls
+from .budget import GraphBudget, NODE_BYTES
 from pysion import Tool, Macro, RGBA
 from pandas import DataFrame
+from numpy import ndarray
+import numpy as np
 
 
 class GeomCol:
+    chunk_reduction = None
+    required_aes = ("x", "y")
+    na_breaks = False
+
     def __init__(
         self,
         data: DataFrame | None = None,
         mapping: dict[str, str] | None = None,
         fill: RGBA | None = None,
         spacing: float | None = None,
+        palette: tuple[RGBA, ...] | None = None,
         index: int = 1,
+        frame_duration: int = 24,
+        precision: int | None = None,
+        controls: bool = False,
     ) -> None:
-        """Accepted mappings: x (mandatory, will use sort order), y (mandatory), fill"""
+        """Accepted mappings: x (mandatory, will use sort order), y (mandatory), fill,
+        frame. When fill is mapped, every level gets a color from palette. When frame
+        is mapped, a single column per x value is animated over time, re-ranked by
+        height at every frame, with frame_duration Fusion frames between consecutive
+        frame values. With precision, offsets, sizes and colors are written rounded to
+        that many decimals.
+        With controls, plot width, height and center are published on the geom's
+        macro, which resize the plot without regenerating it."""
         # data
         self.data = data
         self.mapping = mapping
@@ -20,18 +46,49 @@ class GeomCol:
         # styling
         self.fill = fill if fill else RGBA()
         self.spacing = spacing if spacing else 0.5
+        self.palette = palette if palette else PALETTES.okabe_ito
 
         # index
         self.index = index
 
+        # animation
+        self.frame_duration = frame_duration
+
+        # serialization
+        self.precision = precision
+
+        self.controls = controls
+
         # private params
         self._cols: list[Tool] = []
+        self._controls: Tool | None = None
         self.y_pivot: float = 0
         self.x_offset: float = 0
 
     @property
     def name(self) -> str:
-        pass
+        """Same name of the tool that outputs the final geom image"""
+
+        return f"GeomCol{self.index}"
+
+    def estimate_nodes(self) -> int:
+        """Number of nodes render() will emit, splines excluded."""
+
+        if self.mapping.get("frame") is not None:
+            n_cols = self.data[self.mapping["x"]].nunique()
+        else:
+            n_cols = len(self.data)
+
+        # base shape, one transform per column, merge, render and controls
+        return n_cols + 3 + 2 * self.controls
+
+    def estimate_bytes(self) -> int:
+        return self.estimate_nodes() * NODE_BYTES
+
+    def fit_budget(self, budget: GraphBudget) -> str | None:
+        """Columns can't be dropped without changing what the plot says."""
+
+        return None
 
     def render(
         self,
@@ -40,31 +97,30 @@ class GeomCol:
         mapping_scales: dict[str, tuple[int, int]],
         resolution: tuple[int, int],
     ) -> Macro:
+        if self.mapping.get("frame") is not None:
+            return self._render_animated(width, height, mapping_scales, resolution)
+
         tools: list[Tool] = []
 
         base_col = self._render_base_col(width, height, resolution)
         tools.append(base_col)
 
         fu_x = fusionize_categorical_to_position(len(self.data), dim_to_scale(width))
-        fu_y = fusionize(
+        fu_y = fusionize_array(
             self.data[self.mapping["y"]],
             scale_data=mapping_scales["y"],
             scale_plot=dim_to_scale(height),
         )
 
-        # temporary fill list
-        fill = [self.fill for _ in fu_y]
-
-        transforms = self._render_transforms(base_col, fu_x, fu_y, fill, width)
-        transforms[-1].add_inputs(Width=resolution[0], Height=resolution[1])
+        colors = self._fill_colors(self._fill_codes(mapping_scales))
 
-        tools += transforms
+        cols = Geometry(self._x_offsets(fu_x), fu_y, color=colors)
+        transforms = self._render_transforms(base_col, cols)
+        mrg = self._render_smerge(transforms)
 
-        geom_col = Macro(
-            f"GeomCol{self.index}", type="group", position=(self.index, -1)
-        ).add_tools(*tools)
+        tools += transforms + self._render_output(mrg, width, height, resolution)
 
-        return geom_col
+        return self._render_macro(tools)
 
     def _render_base_col(
         self, width: float, height: float, resolution: tuple[int, int]
@@ -93,50 +149,209 @@ class GeomCol:
     def _add_sbool() -> Tool:
         ...
 
-    def _render_transforms(
+    def _x_offsets(self, positions: ndarray) -> ndarray:
+        """Converts column centers on the canvas into offsets of the base shape, which
+        is centered on the plot's left edge."""
+
+        return positions - 0.5 - self.x_offset
+
+    def _col_size(self, n_cols: int) -> float:
+        """Each column takes its share of the base shape's width, minus spacing."""
+
+        return (1 - self.spacing) / n_cols
+
+    def _fill_codes(self, mapping_scales: dict[str, tuple]) -> ndarray | None:
+        """Every row's index into the fill levels, or None if fill isn't mapped."""
+
+        if self.mapping.get("fill") is None:
+            return None
+
+        values = self.data[self.mapping["fill"]]
+        if is_categorical(values):
+            levels = mapping_scales["fill"]
+        else:
+            levels = categorical_levels(values)
+
+        return categorical_codes(values, levels)
+
+    def _fill_colors(self, codes: ndarray | None) -> ndarray:
+        if codes is None:
+            f = self.fill
+            return np.tile((f.red, f.green, f.blue, f.alpha), (len(self.data), 1))
+
+        return palette_colors(codes, self.palette)
+
+    def _render_transforms(self, base_col: Tool, cols: Geometry) -> list[Tool]:
+        n = len(cols)
+        col_width = float(rounded([self._col_size(n)], self.precision)[0])
+
+        def build(name: str, pos: int, x: float, y: float, r, g, b, a) -> Tool:
+            return (
+                Tool("sTransform", name, (1, pos))
+                .add_inputs(
+                    XOffset=x,
+                    YSize=y,
+                    XSize=col_width,
+                    Red=r,
+                    Blue=b,
+                    Green=g,
+                    Alpha=a,
+                    YPivot=self.y_pivot,
+                    XPivot=self.x_offset,
+                )
+                .add_source_input("Input", base_col.name, base_col.output)
+            )
+
+        template = ToolTemplate(
+            "sTransform",
+            dict(
+                XOffset=Column("x"),
+                YSize=Column("y"),
+                XSize=col_width,
+                Red=Column("r"),
+                Blue=Column("b"),
+                Green=Column("g"),
+                Alpha=Column("a"),
+                YPivot=self.y_pivot,
+                XPivot=self.x_offset,
+                Input=Source(base_col.name, base_col.output),
+            ),
+            (1, Column("pos")),
+        )
+
+        transforms = tool_rows(
+            build,
+            template,
+            dict(
+                name=[f"GeomCol{self.index}Transform{i+1}" for i in range(n)],
+                pos=np.arange(n) - round(n / 2),
+                x=cols.x,
+                y=cols.y,
+                r=cols.color[:, 0],
+                g=cols.color[:, 1],
+                b=cols.color[:, 2],
+                a=cols.color[:, 3],
+            ),
+            self.precision,
+        )
+
+        return transforms
+
+    def _render_smerge(self, transforms: list[Tool]) -> Tool:
+        return merge_tools(f"GeomColMerge{self.index}", transforms, (2, 0))
+
+    def _render_srender(self, merge: Tool) -> Tool:
+        return Tool("sRender", f"GeomColRender{self.index}", (3, 0)).add_source_input(
+            "Input", merge.name, merge.output
+        )
+
+    def _render_output(
+        self, merge: Tool, width: float, height: float, resolution: tuple[int, int]
+    ) -> list[Tool]:
+        """Merge and render, with the plot controls in between if there are any."""
+
+        if self.controls:
+            node = controls_node(f"GeomColControls{self.index}", width, height, (0, -1))
+            plot = plot_transform(
+                f"GeomColPlot{self.index}",
+                merge,
+                node,
+                width,
+                height,
+                resolution,
+                (2, 1),
+            )
+            self._controls = node
+            tools = [node, merge, plot]
+        else:
+            tools = [merge]
+
+        srender = self._render_srender(tools[-1]).add_inputs(
+            Width=resolution[0], Height=resolution[1]
+        )
+
+        return tools + [srender]
+
+    def _render_macro(self, tools: list[Tool]) -> Macro:
+        macro = Macro(
+            f"GeomCol{self.index}", type="group", position=(self.index, -1)
+        ).add_tools(*tools)
+        if self._controls is not None:
+            publish_controls(macro, self._controls, ["width", "height", "center"])
+
+        return macro
+
+    # ANIMATION ========================================
+    def _render_animated(
         self,
-        base_col: Tool,
-        x_values: list[float],
-        y_values: list[float],
-        fill: list[RGBA],
         width: float,
-    ) -> list[Tool]:
-        col_width = (width / len(x_values)) * (1 - self.spacing)
+        height: float,
+        mapping_scales: dict[str, tuple[int, int]],
+        resolution: tuple[int, int],
+    ) -> Macro:
+        base_col = self._render_base_col(width, height, resolution)
+
+        levels, frames = frame_codes(self.data[self.mapping["frame"]])
+        categories, cols = entity_codes(self.data[self.mapping["x"]])
+        n_frames, n_cols = len(levels), len(categories)
+
+        fu_y = fusionize_array(
+            self.data[self.mapping["y"]],
+            scale_data=mapping_scales["y"],
+            scale_plot=dim_to_scale(height),
+        )
+        y = frame_matrix(frames, cols, fu_y, n_frames, n_cols)
+
+        # columns are ranked by height at every frame, tallest first
+        order = np.argsort(-y, axis=1, kind="stable")
+        ranks = np.empty_like(order)
+        np.put_along_axis(ranks, order, np.broadcast_to(np.arange(n_cols), y.shape), 1)
+
+        positions = fusionize_categorical_to_position(n_cols, dim_to_scale(width))
+        x = self._x_offsets(positions[ranks])
+
+        # a column keeps the fill of its first row
+        colors = self._fill_colors(self._fill_codes(mapping_scales))
+        col_colors = np.empty((n_cols, 4))
+        col_colors[cols[::-1]] = colors[::-1]
+        col_colors = col_colors.tolist()
+
+        times = keyframe_times(n_frames, self.frame_duration)
+        col_width = self._col_size(n_cols)
 
         transforms: list[Tool] = []
-        for i, (x, y, f) in enumerate(zip(x_values, y_values, fill)):
-            transforms.append(
+        splines: list[BezierSpline] = []
+        for i in range(n_cols):
+            transform = (
                 Tool(
                     "sTransform",
                     f"GeomCol{self.index}Transform{i+1}",
-                    (1, i - round(len(x_values) / 2)),
+                    (1, i - round(n_cols / 2)),
                 )
                 .add_inputs(
-                    XOffset=x,
-                    YSize=y,
                     XSize=col_width,
-                    Red=f.red,
-                    Blue=f.blue,
-                    Green=f.green,
-                    Alpha=f.alpha,
+                    Red=col_colors[i][0],
+                    Blue=col_colors[i][2],
+                    Green=col_colors[i][1],
+                    Alpha=col_colors[i][3],
                     YPivot=self.y_pivot,
                     XPivot=self.x_offset,
                 )
                 .add_source_input("Input", base_col.name, base_col.output)
             )
-        mrg = self._render_smerge(transforms)
-        srender = self._render_srender(mrg)
 
-        return transforms + [mrg, srender]
+            for input, values in (("XOffset", x[:, i]), ("YSize", y[:, i])):
+                spline = animate_input(
+                    transform, input, times, values, (0, i), self.precision
+                )
+                if spline:
+                    splines.append(spline)
 
-    def _render_smerge(self, transforms: list[Tool]) -> Tool:
-        merge = Tool("sMerge", f"GeomColMerge{self.index}", (2, 0))
-        for i, t in enumerate(transforms, start=1):
-            merge.add_source_input(f"Input{i}", t.name, t.output)
+            transforms.append(transform)
 
-        return merge
+        mrg = self._render_smerge(transforms)
 
-    def _render_srender(self, merge: Tool) -> Tool:
-        return Tool("sRender", f"GeomColRender{self.index}", (3, 0)).add_source_input(
-            "Input", merge.name, merge.output
+        return self._render_macro(
+            [base_col, *splines, *transforms]
+            + self._render_output(mrg, width, height, resolution)
         )
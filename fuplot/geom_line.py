@@ -1,9 +1,28 @@
-from .fusionize import fusionize, dim_to_scale
+from .fusionize import fusionize_array, dim_to_scale, is_categorical
+from .fusionize import categorical_levels, categorical_codes
+from .decimate import decimate, decimation_error, is_sorted, DECIMATION_METHODS
+from .animate import frame_codes, keyframe_times, animate_input
+from .serialize import BezierSpline
+from .geometry import PolylineMask, sort_order
+from .budget import GraphBudget, NODE_BYTES, POINT_BYTES
+from .raster import rasterize_line, raster_rgba, raster_loader, over
+from .style import PALETTES, palette_colors
 from pysion import Tool, Macro, RGBA
+from pysion.values import FuID
 from pandas import DataFrame
+from numpy import ndarray
+from pathlib import Path
+import numpy as np
+
+LINE_BACKENDS = ("polyline", "raster")
 
 
 class GeomLine:
+    chunk_reduction = "line"
+    required_aes = ("x", "y")
+    # non-finite values break the line instead of being dropped
+    na_breaks = True
+
     def __init__(
         self,
         data: DataFrame,
@@ -11,23 +30,112 @@ class GeomLine:
         thickness: float | None = None,
         color: RGBA | None = None,
         index: int = 1,
+        decimate: str | None = None,
+        max_points: int | None = None,
+        frame_duration: int = 24,
+        precision: int | None = None,
+        palette: tuple[RGBA, ...] | None = None,
+        backend: str = "polyline",
+        raster_file: str | Path | None = None,
     ) -> None:
+        """Accepted mappings: x (mandatory), y (mandatory), group, color, frame, order.
+        Every group (or every color, if group isn't mapped) is drawn as its own series,
+        in one macro, with colors picked from palette by color level.
+        Points are joined in x order, or in the order of the order aesthetic if it's
+        mapped, as in a connected scatter plot.
+        Long lines can be downsampled before the polyline is built by setting decimate
+        to "lttb", "minmax" (per pixel column) or "rdp", with an optional max_points
+        budget. The budget defaults to one point per pixel column spanned by the line.
+        When frame is mapped, the line is drawn on over time, revealing the points of
+        each frame value frame_duration Fusion frames after the previous one. Every
+        frame value gets a key, even when decimation dropped all of its points.
+        With precision, points are written rounded to that many decimals.
+        Missing points, kept by the plot's "break" NaN policy, split the line into one
+        polyline per run of points.
+        The "raster" backend draws the line into an image at the plot's resolution,
+        saved to raster_file (a .png or .exr, a temporary PNG by default), and loads it
+        with a single Loader instead of writing every point into a Polyline mask."""
         self.data = data
         self.mapping = mapping
 
+        # decimation
+        if decimate is not None and decimate not in DECIMATION_METHODS:
+            raise ValueError(
+                f'Invalid decimation method "{decimate}". Use one of {DECIMATION_METHODS}.'
+            )
+        self.decimate = decimate
+        self.max_points = max_points
+        self.dropped_points: int = 0
+        self.decimation_error: float = 0.0
+
         # style
         self.thickness = thickness if thickness else 0.003
         self.color = color if color else RGBA()
+        self.palette = palette if palette else PALETTES.okabe_ito
 
         # index
         self.index = index
 
+        # animation
+        self.frame_duration = frame_duration
+
+        # serialization
+        self.precision = precision
+
+        if backend not in LINE_BACKENDS:
+            raise ValueError(
+                f'Invalid line backend "{backend}". Use one of {LINE_BACKENDS}.'
+            )
+        if backend == "raster" and mapping.get("frame") is not None:
+            print('Warning: animated lines can\'t be rasterized. Using "polyline".')
+            backend = "polyline"
+        self.backend = backend
+        self.raster_file = raster_file
+
     @property
     def name(self) -> str:
         """Same name of the tool that outputs the final geom image"""
 
         return f"GeomLine{self.index}"
 
+    def estimate_nodes(self) -> int:
+        """Number of nodes render() will emit, splines excluded."""
+
+        if self.backend == "raster":
+            return 1
+
+        # polyline and color for every series, and merges between them
+        return 3 * self._n_series() - 1
+
+    def estimate_bytes(self) -> int:
+        if self.backend == "raster":
+            return self.estimate_nodes() * NODE_BYTES
+
+        n_points = len(self.data)
+        if self.decimate and self.max_points:
+            n_points = min(n_points, self.max_points * self._n_series())
+
+        return self.estimate_nodes() * NODE_BYTES + n_points * POINT_BYTES
+
+    def fit_budget(self, budget: GraphBudget) -> str | None:
+        """Decimates the line so it fits the budget. Returns a description of what was
+        done, or None if nothing can be done."""
+
+        if self.backend == "raster":
+            return None
+
+        max_points = budget.max_items(self.estimate_nodes() * NODE_BYTES, POINT_BYTES)
+        if max_points is None:
+            return None
+        # the budget is shared by every series
+        max_points = max(max_points // self._n_series(), 1)
+
+        if not self.decimate:
+            self.decimate = "lttb"
+        self.max_points = min(max_points, self.max_points or max_points)
+
+        return f"decimated with {self.decimate} to at most {self.max_points} points"
+
     def render(
         self,
         width: float,
@@ -35,37 +143,296 @@ class GeomLine:
         mapping_scales: dict[str, tuple[int, int]],
         resolution: tuple[int, int],
     ) -> Macro | Tool:
-        fu_x = fusionize(
+        fu_x = fusionize_array(
             self.data[self.mapping["x"]],
             mapping_scales["x"],
             dim_to_scale(width),
         )
-        fu_y = fusionize(
+        fu_y = fusionize_array(
             self.data[self.mapping["y"]],
             mapping_scales["y"],
             dim_to_scale(height),
         )
 
-        points = list(sorted(zip(fu_x, fu_y)))
+        key = None
+        if self.mapping.get("order") is not None:
+            key = np.asarray(self.data[self.mapping["order"]])
 
-        line = (
-            Tool.mask(f"PlotLine{self.index}", "Polyline", (0, -1))
-            .add_inputs(BorderWidth=self.thickness)
-            .add_expression_input("Level", "WriteLength > 0 and 1 or 0")
-            .add_published_polyline(points)
-        )
+        # series are sorted on their own, all in one pass
+        codes, colors = self._series(mapping_scales)
+        if codes is not None and (codes < 0).any():
+            # rows outside every series are left out, like missing points
+            fu_x = np.where(codes < 0, np.nan, fu_x)
 
-        background = Tool.background(
-            f"PlotColor{self.index}", self.color, resolution=resolution
-        ).add_mask(line)
+        order = sort_order(fu_x, fu_y, key, codes)
+        if order is None:
+            order = np.arange(len(fu_x))
+        else:
+            fu_x, fu_y = fu_x[order], fu_y[order]
+        series = np.zeros(len(fu_x), dtype=np.intp) if codes is None else codes[order]
 
-        geom_line = (
-            Macro(self.name, type="group", position=(self.index, -1))
-            .add_tools(line, background)
-            .add_color_input(background)
-            .add_input(line, "BorderWidth", pretty_name="Thickness")
+        # missing points (kept by the "break" NaN policy) split the line into runs,
+        # except when it's animated
+        runs = np.zeros(len(fu_x), dtype=np.intp)
+        finite = np.isfinite(fu_x) & np.isfinite(fu_y)
+        if not finite.all():
+            if self.mapping.get("frame") is None:
+                runs = np.cumsum(~finite)[finite]
+            else:
+                runs = runs[finite]
+            fu_x, fu_y, order = fu_x[finite], fu_y[finite], order[finite]
+            series = series[finite]
+
+        if self.decimate:
+            kept = self._decimate(fu_x, fu_y, series, width, resolution)
+            fu_x, fu_y = fu_x[kept], fu_y[kept]
+            order = order[kept]
+            runs, series = runs[kept], series[kept]
+
+        # first point of every run, at breaks and where a new series starts
+        starts = np.flatnonzero((np.diff(runs) != 0) | (np.diff(series) != 0)) + 1
+        run_series = series[np.r_[0, starts]] if len(series) else np.zeros(1, np.intp)
+
+        if self.backend == "raster":
+            return self._render_raster(
+                fu_x, fu_y, starts, run_series, colors, resolution
+            )
+
+        frames, n_frames = None, 0
+        if self.mapping.get("frame") is not None:
+            # frame levels are shared by every series, whichever frames it's in
+            levels, frames = frame_codes(self.data[self.mapping["frame"]])
+            frames, n_frames = frames[order], len(levels)
+
+        bounds = np.r_[0, starts, len(fu_x)]
+        tools: list[Tool] = []
+        line: Tool | None = None
+        mask: Tool | None = None
+        output: Tool | None = None
+        n_series = 0
+
+        for i, (lo, hi) in enumerate(zip(bounds[:-1], bounds[1:])):
+            x, y = fu_x[lo:hi], fu_y[lo:hi]
+            if line is None:
+                line = (
+                    PolylineMask.mask(f"PlotLine{self.index}", "Polyline", (0, -1))
+                    .add_inputs(BorderWidth=self.thickness)
+                    .add_expression_input("Level", "WriteLength > 0 and 1 or 0")
+                    .add_published_points(x, y, self.precision)
+                )
+                mask = line
+            else:
+                mask = self._render_run(line, mask, x, y, i + 1)
+            tools.append(mask)
+
+            if i + 1 < len(run_series) and run_series[i + 1] == run_series[i]:
+                continue
+
+            # last run of a series: animated lines have a single run per series
+            if frames is not None:
+                spline = self._render_reveal(
+                    mask, x, y, frames[lo:hi], n_frames, resolution
+                )
+                if spline:
+                    tools.append(spline)
+
+            n_series += 1
+            suffix = "" if n_series == 1 else f"Series{n_series}"
+            background = Tool.background(
+                f"PlotColor{self.index}{suffix}",
+                colors[run_series[i]],
+                resolution=resolution,
+            ).add_mask(mask)
+            tools.append(background)
+
+            if output is None:
+                output = background
+            else:
+                output = (
+                    Tool("Merge", f"PlotMerge{self.index}{suffix}", (1, n_series))
+                    .add_source_input("Background", output.name, output.output)
+                    .add_source_input("Foreground", background.name, background.output)
+                )
+                tools.append(output)
+            mask = None
+
+        geom_line = Macro(self.name, type="group", position=(self.index, -1)).add_tools(
+            *tools
+        )
+        if codes is None:
+            geom_line.add_color_input(background)
+
+        return (
+            geom_line.add_input(line, "BorderWidth", pretty_name="Thickness")
             .add_input(line, "WritePosition", "Position")
             .add_input(line, "WriteLength", "Length")
         )
 
-        return geom_line
+    def _series(
+        self, mapping_scales: dict[str, tuple]
+    ) -> tuple[ndarray | None, list[RGBA]]:
+        """Every row's series, by group or else by color, and every series' color.
+        Without either, the line is a single series in the line's color."""
+
+        by = "group" if self.mapping.get("group") is not None else "color"
+        if self.mapping.get(by) is None:
+            return None, [self.color]
+
+        levels, codes = self._codes(by, mapping_scales)
+        if self.mapping.get("color") is None:
+            return codes, [self.color] * len(levels)
+
+        if by == "color":
+            color_codes = np.arange(len(levels))
+        else:
+            # every series takes the color of its first row
+            _, row_colors = self._codes("color", mapping_scales)
+            valid = codes >= 0
+            color_codes = np.full(len(levels), -1)
+            color_codes[codes[valid][::-1]] = row_colors[valid][::-1]
+
+        return codes, [
+            RGBA(*map(float, c)) for c in palette_colors(color_codes, self.palette)
+        ]
+
+    def _codes(
+        self, aes: str, mapping_scales: dict[str, tuple]
+    ) -> tuple[ndarray, ndarray]:
+        """Levels of a discrete aesthetic, shared with other geoms when categorical,
+        and every row's index into them."""
+
+        values = self.data[self.mapping[aes]]
+        if is_categorical(values) and aes in mapping_scales:
+            levels = np.asarray(mapping_scales[aes])
+        else:
+            levels = categorical_levels(values)
+
+        return levels, categorical_codes(values, levels)
+
+    def _n_series(self) -> int:
+        for aes in ("group", "color"):
+            if self.mapping.get(aes) is not None:
+                return max(self.data[self.mapping[aes]].nunique(), 1)
+
+        return 1
+
+    def _render_run(
+        self, line: Tool, previous: Tool | None, x: ndarray, y: ndarray, i: int
+    ) -> Tool:
+        """Polyline for a run of the line after a break, or in another series, added
+        to the previous run's mask in the same series. It's as thick as the first one,
+        and unless the line is animated, drawn as far."""
+
+        run = PolylineMask.mask(f"PlotLine{self.index}Run{i}", "Polyline", (0, -i))
+        run.add_expression_input("BorderWidth", f"{line.name}.BorderWidth")
+        if self.mapping.get("frame") is None:
+            run.add_expression_input(
+                "WritePosition", f"{line.name}.WritePosition"
+            ).add_expression_input("WriteLength", f"{line.name}.WriteLength")
+        run.add_expression_input("Level", "WriteLength > 0 and 1 or 0")
+        run.add_published_points(x, y, self.precision)
+
+        if previous is not None:
+            run.add_mask(previous).add_inputs(PaintMode=FuID.add())
+
+        return run
+
+    def _render_raster(
+        self,
+        x: ndarray,
+        y: ndarray,
+        starts: ndarray,
+        run_series: ndarray,
+        colors: list[RGBA],
+        resolution: tuple[int, int],
+    ) -> Macro:
+        # runs are separated by missing points, where the line breaks
+        x, y = np.insert(x, starts, np.nan), np.insert(y, starts, np.nan)
+        firsts = np.r_[0, starts + np.arange(1, len(starts) + 1)]
+
+        # every series is drawn over the previous ones
+        new = np.r_[True, np.diff(run_series) != 0]
+        bounds = np.r_[firsts[new], len(x)]
+        image = None
+        for lo, hi, s in zip(bounds[:-1], bounds[1:], run_series[new]):
+            alpha = rasterize_line(x[lo:hi], y[lo:hi], self.thickness, resolution)
+            layer = raster_rgba(alpha, colors[s])
+            image = layer if image is None else over(image, layer)
+
+        loader = raster_loader(f"GeomLineRaster{self.index}", image, self.raster_file)
+
+        return Macro(self.name, type="group", position=(self.index, -1)).add_tools(
+            loader
+        )
+
+    def _decimate(
+        self,
+        x: ndarray,
+        y: ndarray,
+        series: ndarray,
+        width: float,
+        resolution: tuple[int, int],
+    ) -> ndarray:
+        """Downsamples every series of the line on its own, measuring the result in
+        pixels, and returns the indices of the points to keep. Records the number of
+        dropped points and the largest deviation from the full line."""
+
+        px_x = x * resolution[0]
+        px_y = y * resolution[1]
+        n_columns = max(int(np.ceil(width * resolution[0])), 1)
+
+        bounds = np.r_[0, np.flatnonzero(np.diff(series)) + 1, len(x)]
+        kept, errors = [], []
+        unsorted = False
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            method = self.decimate
+            if method == "minmax" and not is_sorted(px_x[lo:hi]):
+                # paths following the order aesthetic don't run along pixel columns
+                method = "rdp"
+                unsorted = True
+
+            k = decimate(px_x[lo:hi], px_y[lo:hi], method, self.max_points, n_columns)
+            errors.append(decimation_error(px_x[lo:hi], px_y[lo:hi], k))
+            kept.append(lo + k)
+        kept = np.concatenate(kept)
+
+        if unsorted:
+            print('Warning: "minmax" needs lines sorted by x. Decimating with "rdp".')
+
+        self.dropped_points = len(x) - len(kept)
+        self.decimation_error = max(errors)
+
+        return kept
+
+    def _render_reveal(
+        self,
+        line: Tool,
+        x: ndarray,
+        y: ndarray,
+        frames: ndarray,
+        n_frames: int,
+        resolution: tuple[int, int],
+    ) -> BezierSpline | None:
+        """Keyframes the polyline's WriteLength so that, at every frame value, the line
+        is drawn up to the last point belonging to it or to an earlier frame. frames
+        are the points' indices into the layer's n_frames frame levels, so every series
+        is keyed at the same times."""
+
+        segments = np.hypot(np.diff(x) * resolution[0], np.diff(y) * resolution[1])
+        length = np.r_[0, np.cumsum(segments)]
+
+        # last point of each frame, never going back in time
+        last = np.zeros(n_frames, dtype=np.intp)
+        np.maximum.at(last, frames, np.arange(len(frames)))
+        last = np.maximum.accumulate(last)
+
+        if length[-1] > 0:
+            write_length = length[last] / length[-1]
+        else:
+            write_length = np.ones(n_frames)
+
+        times = keyframe_times(n_frames, self.frame_duration)
+
+        return animate_input(
+            line, "WriteLength", times, write_length, (1, -1), self.precision
+        )
@@ -1,10 +1,27 @@
-from .fusionize import fusionize, dim_to_scale
+from .fusionize import fusionize_array, dim_to_scale
+from .animate import frame_codes, entity_codes, occurrence_codes, frame_matrix
+from .animate import keyframe_times, animate_input
+from .serialize import BezierSpline
+from .geometry import Geometry, tool_rows, rounded, sort_order
+from .geometry import ToolTemplate, Column, Source, merge_tools
+from .controls import controls_node, plot_transform, keep_proportions
+from .controls import publish_controls
+from .budget import GraphBudget, NODE_BYTES, thin
+from .raster import rasterize_points, raster_rgba, raster_loader
 from pysion import Tool, Macro, RGBA
 from pysion.values import FuID
 from pandas import DataFrame
+from pathlib import Path
+import numpy as np
+
+POINT_BACKENDS = ("mask", "shape", "raster")
 
 
 class GeomPoint:
+    chunk_reduction = "points"
+    required_aes = ("x", "y")
+    na_breaks = False
+
     def __init__(
         self,
         data: DataFrame,
@@ -15,7 +32,29 @@ class GeomPoint:
         max_size: float = None,
         min_size: float = None,
         index: int = 1,
+        backend: str = "mask",
+        frame_duration: int = 24,
+        max_points: int | None = None,
+        precision: int | None = None,
+        controls: bool = False,
+        raster_file: str | Path | None = None,
     ) -> None:
+        """Accepted mappings: x (mandatory), y (mandatory), size, frame, group, order.
+        Points are drawn sorted by x and y, or by order if it's mapped.
+        The "mask" backend chains one Ellipse mask per point, while the "shape" backend
+        instances a single sEllipse with one sTransform per point, which keeps the node
+        graph flat. The "raster" backend draws the points into an image at the plot's
+        resolution, saved to raster_file (a .png or .exr, a temporary PNG by default),
+        and loads it with a single Loader.
+        When frame is mapped, points are animated with the shape backend, one per
+        group (or per row order within each frame if group isn't mapped), with
+        frame_duration Fusion frames between consecutive frame values.
+        With max_points, overlapping points are dropped (and the rest subsampled) until
+        at most max_points are left. With precision, coordinates and sizes are written
+        rounded to that many decimals.
+        With controls, the shape backend publishes plot width, height, center and a
+        size scale on the geom's macro, which resize the plot without regenerating
+        it."""
         self.data = data
         self.mapping = mapping
 
@@ -33,7 +72,32 @@ class GeomPoint:
         # index
         self.index = index
 
+        if backend not in POINT_BACKENDS:
+            raise ValueError(
+                f'Invalid point backend "{backend}". Use one of {POINT_BACKENDS}.'
+            )
+        if backend == "raster" and mapping.get("frame") is not None:
+            print('Warning: animated points can\'t be rasterized. Using "shape".')
+            backend = "shape"
+        self.backend = backend
+
+        if controls and backend != "shape":
+            raise ValueError('Plot controls are only supported by the "shape" backend.')
+        self.controls = controls
+
+        # animation
+        self.frame_duration = frame_duration
+
+        # thinning
+        self.max_points = max_points
+        self.dropped_points: int = 0
+
+        # serialization
+        self.precision = precision
+        self.raster_file = raster_file
+
         self._points: list[Tool] = []
+        self._controls: Tool | None = None
 
         if self.fill.alpha < 1:
             print(
@@ -47,6 +111,51 @@ class GeomPoint:
 
         return f"GeomPoint{self.index}"
 
+    def estimate_nodes(self) -> int:
+        """Number of nodes render() will emit, splines excluded."""
+
+        if self.mapping.get("frame") is not None:
+            if self.mapping.get("group") is not None:
+                n_points = self.data[self.mapping["group"]].nunique()
+            else:
+                n_points = self.data[self.mapping["frame"]].value_counts().max()
+            return n_points + 3
+
+        n_points = len(self.data)
+        if self.max_points:
+            n_points = min(n_points, self.max_points)
+
+        if self.backend == "raster":
+            return 1
+
+        if self.backend == "shape":
+            # base shape, one transform per point, merge, render and controls
+            return n_points + 3 + 2 * self.controls
+
+        # one mask per point and the fill
+        return n_points + 1
+
+    def estimate_bytes(self) -> int:
+        return self.estimate_nodes() * NODE_BYTES
+
+    def fit_budget(self, budget: GraphBudget) -> str | None:
+        """Caps the number of points so the geom fits the budget. Returns a description
+        of what was done, or None if nothing can be done."""
+
+        if self.mapping.get("frame") is not None or self.backend == "raster":
+            return None
+
+        # nodes emitted regardless of the number of points
+        fixed = 3 if self.backend == "shape" else 1
+
+        limits = [budget.max_items(fixed * NODE_BYTES, NODE_BYTES)]
+        if budget.max_nodes is not None:
+            limits.append(max(budget.max_nodes - fixed, 1))
+
+        self.max_points = min(m for m in limits + [self.max_points] if m)
+
+        return f"thinned to at most {self.max_points} points"
+
     def render(
         self,
         width: float,
@@ -54,37 +163,67 @@ class GeomPoint:
         mapping_scales: dict[str, tuple[int, int]],
         resolution: tuple[int, int],
     ) -> Tool:
-        fu_x = fusionize(
+        if self.mapping.get("frame") is not None:
+            return self._render_animated(width, height, mapping_scales, resolution)
+
+        fu_x = fusionize_array(
             self.data[self.mapping["x"]],
             mapping_scales["x"],
             dim_to_scale(width),
         )
-        fu_y = fusionize(
+        fu_y = fusionize_array(
             self.data[self.mapping["y"]],
             mapping_scales["y"],
             dim_to_scale(height),
         )
 
         if "size" in self.mapping:
-            fu_size = fusionize(
+            fu_size = fusionize_array(
                 values=self.data[self.mapping["size"]],
                 scale_data=mapping_scales["size"],
                 scale_plot=(self.min_size, self.max_size),
             )
         else:
-            fu_size = [self.size for _ in fu_x]
+            fu_size = np.full(len(fu_x), self.size)
+
+        points = Geometry(fu_x, fu_y, fu_size)
+        key = None
+        if self.mapping.get("order") is not None:
+            key = np.asarray(self.data[self.mapping["order"]])
+
+        self.dropped_points = 0
+        if self.max_points and len(fu_x) > self.max_points:
+            kept = thin(fu_x, fu_y, self.max_points, resolution)
+            self.dropped_points = len(fu_x) - len(kept)
+            points = points.take(kept)
+            key = None if key is None else key[kept]
+
+        if self.backend == "raster":
+            return self._render_raster(points, resolution)
 
-        points = list(sorted(zip(fu_x, fu_y)))
+        # every aesthetic is reordered with the same indices
+        order = sort_order(points.x, points.y, key)
+        if order is not None:
+            points = points.take(order)
 
-        for p, s in zip(points, fu_size):
-            self._add_point(p[0], p[1], s)
+        if self.backend == "shape":
+            tools = self._render_shapes(points, width, height, resolution)
+
+            return self._render_macro(tools)
+
+        self._points = self._render_masks(points)
 
         bg = Tool.background(
             "GeomPointFill",
             RGBA(self.fill.red, self.fill.green, self.fill.blue),
             resolution=resolution,
-            position=(0, len(self.points)),
-        ).add_mask(self.points[-1])
+            position=(0, len(points)),
+        )
+        if len(points):
+            bg.add_mask(Tool.mask(f"Point{len(points)}", "Ellipse"))
+        else:
+            # nothing to draw: the fill is left unmasked and fully transparent
+            bg.add_inputs(TopLeftAlpha=0)
 
         macro = Macro(self.name, type="group", position=(self.index, -1)).add_tools(
             *(self.points + [bg])
@@ -96,13 +235,259 @@ class GeomPoint:
     def points(self) -> list[Tool]:
         return self._points
 
-    def _add_point(self, x: float, y: float, size: float):
+    def _render_masks(self, points: Geometry) -> list[Tool]:
+        """One Ellipse mask per point, each one added to the previous one's."""
+
+        n = len(points)
+        if n == 0:
+            return []
+        sizes = points.size[:n]
+
+        x, y, s = rounded([points.x[0], points.y[0], sizes[0]], self.precision)
+        first = Tool.mask("Point1", "Ellipse", (0, 0)).add_inputs(
+            Width=float(s),
+            Height=float(s),
+            Center=(float(x), float(y)),
+            Level=self.opacity,
+        )
+
+        def build(name: str, pos: int, mask: str, x: float, y: float, s: float):
+            return (
+                Tool.mask(name, "Ellipse", (0, pos))
+                .add_inputs(Width=s, Height=s, Center=(x, y), Level=self.opacity)
+                .add_mask(Tool.mask(mask, "Ellipse"))
+                .add_inputs(PaintMode=FuID.add())
+            )
+
+        template = ToolTemplate(
+            "EllipseMask",
+            dict(
+                Width=Column("s"),
+                Height=Column("s"),
+                Center=(Column("x"), Column("y")),
+                Level=self.opacity,
+                EffectMask=Source(Column("mask")),
+                PaintMode=FuID.add(),
+            ),
+            (0, Column("pos")),
+        )
+
+        rest = tool_rows(
+            build,
+            template,
+            dict(
+                name=[f"Point{i+1}" for i in range(1, n)],
+                pos=range(1, n),
+                mask=[f"Point{i}" for i in range(1, n)],
+                x=points.x[1:],
+                y=points.y[1:],
+                s=sizes[1:],
+            ),
+            self.precision,
+        )
+
+        return [first] + rest
+
+    # RASTER BACKEND ========================================
+    def _render_raster(self, points: Geometry, resolution: tuple[int, int]) -> Macro:
+        alpha = rasterize_points(
+            points.x, points.y, points.size, self.opacity, resolution
+        )
+        loader = raster_loader(
+            f"GeomPointRaster{self.index}",
+            raster_rgba(alpha, RGBA(self.fill.red, self.fill.green, self.fill.blue)),
+            self.raster_file,
+        )
+
+        return Macro(self.name, type="group", position=(self.index, -1)).add_tools(
+            loader
+        )
+
+    # SHAPE BACKEND ========================================
+    def _render_shapes(
+        self,
+        points: Geometry,
+        width: float,
+        height: float,
+        resolution: tuple[int, int],
+    ) -> list[Tool]:
+        base_point = self._render_base_point()
+
+        transforms = self._render_transforms(base_point, points, resolution)
+        mrg = self._render_smerge(transforms)
 
-        i = len(self.points)
-        ellipse = Tool.mask(f"Point{i+1}", "Ellipse", (0, i)).add_inputs(
-            Width=size, Height=size, Center=(x, y), Level=self.opacity
+        return (
+            [base_point]
+            + transforms
+            + self._render_output(base_point, mrg, width, height, resolution)
         )
-        if len(self.points) > 0:
-            ellipse.add_mask(self.points[i - 1]).add_inputs(PaintMode=FuID.add())
 
-        self._points.append(ellipse)
+    def _render_output(
+        self,
+        base_point: Tool,
+        merge: Tool,
+        width: float,
+        height: float,
+        resolution: tuple[int, int],
+    ) -> list[Tool]:
+        """Merge and render, with the plot controls in between if there are any."""
+
+        if not self.controls:
+            return [merge, self._render_srender(merge, resolution)]
+
+        node = controls_node(f"GeomPointControls{self.index}", width, height, (0, -1))
+        keep_proportions(base_point, node, width, height)
+        plot = plot_transform(
+            f"GeomPointPlot{self.index}", merge, node, width, height, resolution, (2, 1)
+        )
+        self._controls = node
+
+        return [node, merge, plot, self._render_srender(plot, resolution)]
+
+    def _render_macro(self, tools: list[Tool]) -> Macro:
+        macro = Macro(self.name, type="group", position=(self.index, -1)).add_tools(
+            *tools
+        )
+        if self._controls is not None:
+            publish_controls(
+                macro, self._controls, ["width", "height", "center", "size"]
+            )
+
+        return macro
+
+    def _render_base_point(self) -> Tool:
+        return Tool("sEllipse", f"GeomPointShape{self.index}", (0, 0)).add_inputs(
+            Width=1,
+            Height=1,
+            Red=self.fill.red,
+            Green=self.fill.green,
+            Blue=self.fill.blue,
+            Alpha=self.opacity,
+        )
+
+    def _render_transforms(
+        self,
+        base_point: Tool,
+        points: Geometry,
+        resolution: tuple[int, int],
+    ) -> list[Tool]:
+        # shape space is centered on the canvas and measured in canvas widths
+        ar = resolution[0] / resolution[1]
+        n = len(points)
+
+        def build(name: str, pos: int, x: float, y: float, s: float) -> Tool:
+            return (
+                Tool("sTransform", name, (1, pos))
+                .add_inputs(XOffset=x, YOffset=y, XSize=s, YSize=s)
+                .add_source_input("Input", base_point.name, base_point.output)
+            )
+
+        template = ToolTemplate(
+            "sTransform",
+            dict(
+                XOffset=Column("x"),
+                YOffset=Column("y"),
+                XSize=Column("s"),
+                YSize=Column("s"),
+                Input=Source(base_point.name, base_point.output),
+            ),
+            (1, Column("pos")),
+        )
+
+        return tool_rows(
+            build,
+            template,
+            dict(
+                name=[f"GeomPoint{self.index}Transform{i+1}" for i in range(n)],
+                pos=np.arange(n) - round(n / 2),
+                x=points.x - 0.5,
+                y=(points.y - 0.5) / ar,
+                s=points.size[:n],
+            ),
+            self.precision,
+        )
+
+    def _render_smerge(self, transforms: list[Tool]) -> Tool:
+        return merge_tools(f"GeomPointMerge{self.index}", transforms, (2, 0))
+
+    def _render_srender(self, merge: Tool, resolution: tuple[int, int]) -> Tool:
+        return (
+            Tool("sRender", f"GeomPointRender{self.index}", (3, 0))
+            .add_inputs(Width=resolution[0], Height=resolution[1])
+            .add_source_input("Input", merge.name, merge.output)
+        )
+
+    # ANIMATION ========================================
+    def _render_animated(
+        self,
+        width: float,
+        height: float,
+        mapping_scales: dict[str, tuple[int, int]],
+        resolution: tuple[int, int],
+    ) -> Macro:
+        ar = resolution[0] / resolution[1]
+
+        levels, frames = frame_codes(self.data[self.mapping["frame"]])
+        if self.mapping.get("group") is not None:
+            _, points = entity_codes(self.data[self.mapping["group"]])
+        else:
+            points = occurrence_codes(frames)
+        n_frames, n_points = len(levels), int(points.max()) + 1
+
+        fu_x = fusionize_array(
+            self.data[self.mapping["x"]], mapping_scales["x"], dim_to_scale(width)
+        )
+        fu_y = fusionize_array(
+            self.data[self.mapping["y"]], mapping_scales["y"], dim_to_scale(height)
+        )
+        if self.mapping.get("size") is not None:
+            fu_size = fusionize_array(
+                self.data[self.mapping["size"]],
+                mapping_scales["size"],
+                (self.min_size, self.max_size),
+            )
+        else:
+            fu_size = np.full(len(fu_x), self.size)
+
+        # every aesthetic, for every frame, in shape space
+        x = frame_matrix(frames, points, fu_x - 0.5, n_frames, n_points)
+        y = frame_matrix(frames, points, (fu_y - 0.5) / ar, n_frames, n_points)
+        size = frame_matrix(frames, points, fu_size, n_frames, n_points)
+
+        times = keyframe_times(n_frames, self.frame_duration)
+        base_point = self._render_base_point()
+
+        transforms: list[Tool] = []
+        splines: list[BezierSpline] = []
+        for i in range(n_points):
+            transform = Tool(
+                "sTransform",
+                f"GeomPoint{self.index}Transform{i+1}",
+                (1, i - round(n_points / 2)),
+            ).add_source_input("Input", base_point.name, base_point.output)
+
+            for input, values in (
+                ("XOffset", x[:, i]),
+                ("YOffset", y[:, i]),
+                ("XSize", size[:, i]),
+            ):
+                spline = animate_input(
+                    transform, input, times, values, (0, i), self.precision
+                )
+                if spline:
+                    splines.append(spline)
+
+            # points stay round
+            if spline:
+                transform.add_source_input("YSize", spline.name, "Value")
+            else:
+                transform.add_inputs(YSize=float(size[0, i]))
+
+            transforms.append(transform)
+
+        mrg = self._render_smerge(transforms)
+
+        return self._render_macro(
+            [base_point, *splines, *transforms]
+            + self._render_output(base_point, mrg, width, height, resolution)
+        )
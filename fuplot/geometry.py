@@ -0,0 +1,449 @@
+from .serialize import deferred_text
+from pysion import Tool, Macro
+from typing import Any, Callable, Iterable, Iterator, NamedTuple, Sequence
+from itertools import chain, islice
+from numpy import ndarray
+import copy
+import numpy as np
+
+"""Array backed geometry for geoms that emit one tool per row. Rows are kept as
+columns of values and written through a text template, instead of building a pysion
+Tool for every one of them. Templates write the same Fusion text pysion does, and
+are checked against it before they're used."""
+
+
+# node grid of the flow, in pixels per position unit
+GRID = (110, 33)
+
+# Fusion text of a tool, as pysion writes it: a head, a line per input, and a tail
+TOOL_HEAD = "{name} = {tool_id} {{\n\tInputs = {{\n"
+VALUE_INPUT = "\t\t{name} = Input {{ Value = {value}, }},\n"
+SOURCE_INPUT = '\t\t{name} = Input {{ SourceOp = "{tool}", Source = "{output}", }},\n'
+TOOL_TAIL = "\t}},\n\tViewInfo = OperatorInfo {{ Pos = {{ {x}, {y} }} }},\n}}"
+
+# what a Macro writes between two of its tools
+TOOL_SEPARATOR = ",\n"
+
+# a point of a polyline, and what's written between two of them
+POLYLINE_POINT = "{ Linear = true, X = %s, Y = %s }"
+POINT_SEPARATOR = ", "
+
+# False writes every row with pysion instead, e.g. to compare the two
+TEMPLATES = True
+
+# rows (or polyline points) formatted at once when writing a comp
+TEXT_BATCH = 10000
+
+# what's been written with pysion because a template didn't match it, warned once
+_MISMATCHES: set[str] = set()
+
+
+class Geometry:
+    """Struct of arrays with one row per instance: positions, sizes and colors (as
+    rows of red, green, blue and alpha), all float64."""
+
+    __slots__ = ("x", "y", "size", "color")
+
+    def __init__(
+        self,
+        x: ndarray,
+        y: ndarray,
+        size: ndarray | None = None,
+        color: ndarray | None = None,
+    ) -> None:
+        self.x = np.asarray(x, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64)
+        self.size = None if size is None else np.asarray(size, dtype=np.float64)
+        self.color = None if color is None else np.asarray(color, dtype=np.float64)
+
+    def __len__(self) -> int:
+        return len(self.x)
+
+    def take(self, index: ndarray) -> "Geometry":
+        return Geometry(
+            self.x[index],
+            self.y[index],
+            None if self.size is None else self.size[index],
+            None if self.color is None else self.color[index],
+        )
+
+
+def sort_order(
+    x: ndarray,
+    y: ndarray,
+    key: ndarray | None = None,
+    groups: ndarray | None = None,
+) -> ndarray | None:
+    """Indices that sort rows by x, then y, or by key if there is one, keeping ties in
+    the order they came in. With groups, rows are sorted by group first, so every group
+    ends up contiguous and sorted on its own. None if rows are sorted already, as time
+    series usually are, so nothing has to be reordered."""
+
+    if key is not None:
+        key = np.asarray(key)
+        ordered = key[1:] >= key[:-1]
+        keys = (key,)
+    else:
+        dx = np.diff(x)
+        ordered = (dx > 0) | ((dx == 0) & (np.diff(y) >= 0))
+        keys = (y, x)
+
+    if groups is not None:
+        dg = np.diff(groups)
+        ordered = (dg > 0) | ((dg == 0) & ordered)
+        keys = keys + (groups,)
+
+    if np.all(ordered):
+        return None
+    if len(keys) == 1:
+        return np.argsort(key, kind="stable")
+
+    return np.lexsort(keys)
+
+
+class Column(str):
+    """Name of a column of values, standing for a different value on every row."""
+
+
+class Source(NamedTuple):
+    """Input connected to the output of another tool."""
+
+    tool: str
+    output: str = "Output"
+
+
+class ToolTemplate:
+    """Fusion text of one kind of tool, the way pysion writes it: its inputs, in the
+    order they're added, and its position. Inputs, source tools and the position
+    can be Columns, filled in with every row's value. Rows are written with a single
+    % formatting pass over all of them."""
+
+    __slots__ = ("tool_id", "inputs", "position")
+
+    def __init__(
+        self,
+        tool_id: str,
+        inputs: dict[str, Any],
+        position: tuple[Any, Any] = (0, 0),
+    ) -> None:
+        self.tool_id = tool_id
+        self.inputs = inputs
+        self.position = position
+
+    @property
+    def floats(self) -> set[str]:
+        """Columns of input values, written as floats."""
+
+        values = chain.from_iterable(
+            v if isinstance(v, tuple) and not isinstance(v, Source) else (v,)
+            for v in self.inputs.values()
+        )
+
+        return {v for v in values if isinstance(v, Column)}
+
+    def format(self, precision: int | None = None) -> tuple[str, list[tuple]]:
+        """% format of a single row, and the (column, scale) filling each of its holes
+        in order, scale being None for columns written as they are."""
+
+        holes: list[tuple[str, int | None]] = [("name", None)]
+        spec = _float_spec(precision)
+
+        def value(v: Any) -> str:
+            if isinstance(v, Column):
+                holes.append((v, None))
+                return spec
+            if isinstance(v, tuple):
+                return "{ " + ", ".join(value(c) for c in v) + " }"
+            return _escape(repr(v))
+
+        def text(v: Any) -> str:
+            if isinstance(v, Column):
+                holes.append((v, None))
+                return "%s"
+            return _escape(str(v))
+
+        lines = [TOOL_HEAD.format(name="%s", tool_id=_escape(self.tool_id))]
+        for name, v in self.inputs.items():
+            name = _escape(name)
+            if isinstance(v, Source):
+                tool, output = text(v.tool), text(v.output)
+                lines.append(SOURCE_INPUT.format(name=name, tool=tool, output=output))
+            else:
+                lines.append(VALUE_INPUT.format(name=name, value=value(v)))
+
+        pos = []
+        for v, scale in zip(self.position, GRID):
+            if isinstance(v, Column):
+                holes.append((v, scale))
+                pos.append("%d")
+            else:
+                pos.append(str(v * scale))
+        lines.append(TOOL_TAIL.format(x=pos[0], y=pos[1]))
+
+        return "".join(lines), holes
+
+    def text(self, values: dict[str, Sequence], precision: int | None = None) -> str:
+        """Text of every row, joined like a Macro joins its tools."""
+
+        row, holes = self.format(precision)
+        columns = [
+            values[c] if scale is None else (np.asarray(values[c]) * scale).tolist()
+            for c, scale in holes
+        ]
+
+        n = len(columns[0]) if columns else 0
+        if not n:
+            return ""
+
+        rows = (row + _escape(TOOL_SEPARATOR)) * (n - 1) + row
+
+        return rows % tuple(chain.from_iterable(zip(*columns)))
+
+
+class ToolArray(Tool):
+    """Stands for a run of tools of the same kind, one per row of values, and writes
+    them through a ToolTemplate. pysion sees a single tool. Written to a comp, rows
+    are formatted TEXT_BATCH at a time."""
+
+    def __init__(
+        self,
+        template: ToolTemplate,
+        values: dict[str, Sequence],
+        output: str,
+        precision: int | None = None,
+    ) -> None:
+        super().__init__("ToolArray", values["name"][0])
+        self.template = template
+        self.values = values
+        self.output = output
+        self.precision = precision
+
+    @property
+    def names(self) -> Sequence[str]:
+        return self.values["name"]
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __repr__(self) -> str:
+        marker = deferred_text(self.chunks())
+        if marker is not None:
+            return marker
+
+        return "".join(self.chunks())
+
+    def chunks(self) -> Iterator[str]:
+        """Text of the rows, TEXT_BATCH at a time."""
+
+        for start in range(0, len(self), TEXT_BATCH):
+            if start:
+                yield TOOL_SEPARATOR
+            batch = {k: v[start : start + TEXT_BATCH] for k, v in self.values.items()}
+            yield self.template.text(batch, self.precision)
+
+
+class PolylineMask(Tool):
+    """Polyline mask whose points are written as POLYLINE_POINTs, instead of by
+    pysion one at a time. Make it with PolylineMask.mask(name, "Polyline", position)
+    and set its points with add_published_points. pysion writes the rest of the tool
+    around the first two points, which are then replaced by all of them. If pysion
+    doesn't write the points the same way, it writes all of them."""
+
+    # x and y of every point, interleaved, while they're written here
+    _points: list[float] | None = None
+    precision: int | None = None
+
+    def add_published_points(
+        self, x: ndarray, y: ndarray, precision: int | None = None
+    ) -> "PolylineMask":
+        if TEMPLATES and len(x) > 1:
+            first = [(float(x[0]), float(y[0])), (float(x[1]), float(y[1]))]
+            probe = copy.deepcopy(self).add_published_polyline(first)
+            if _points_text(first) in repr(probe):
+                self._points = np.column_stack((x, y)).ravel().tolist()
+                self.precision = precision
+                return self.add_published_polyline(first)
+            _warn_mismatch("Polyline points")
+
+        x, y = rounded(x, precision), rounded(y, precision)
+        return self.add_published_polyline(
+            list(zip(np.asarray(x).tolist(), np.asarray(y).tolist()))
+        )
+
+    def __repr__(self) -> str:
+        text = super().__repr__()
+        if self._points is None:
+            return text
+
+        first = [tuple(self._points[:2]), tuple(self._points[2:4])]
+        points = deferred_text(self._point_chunks())
+        if points is None:
+            points = "".join(self._point_chunks())
+
+        return text.replace(_points_text(first), points, 1)
+
+    def _point_chunks(self) -> Iterator[str]:
+        spec = _float_spec(self.precision)
+        point = POLYLINE_POINT % (spec, spec)
+        separator = _escape(POINT_SEPARATOR)
+
+        for start in range(0, len(self._points), 2 * TEXT_BATCH):
+            if start:
+                yield POINT_SEPARATOR
+            batch = self._points[start : start + 2 * TEXT_BATCH]
+            n = len(batch) // 2
+            yield ((point + separator) * (n - 1) + point) % tuple(batch)
+
+
+class SourceMerge(Tool):
+    """sMerge with an input for every tool, from Input1 on, counting every row of a
+    ToolArray. Written to a comp, inputs are written TEXT_BATCH at a time."""
+
+    def __init__(
+        self, name: str, sources: list[Tool], position: tuple[int, int] = (0, 0)
+    ) -> None:
+        super().__init__("sMerge", name, position)
+        self.sources = sources
+        self.node_position = position
+
+    def __repr__(self) -> str:
+        marker = deferred_text(self.chunks())
+        if marker is not None:
+            return marker
+
+        return "".join(self.chunks())
+
+    def chunks(self) -> Iterator[str]:
+        return self._chunks(tool_outputs(self.sources))
+
+    def _chunks(self, outputs: Iterator[tuple[str, str]]) -> Iterator[str]:
+        yield TOOL_HEAD.format(name=self.name, tool_id="sMerge")
+
+        line = SOURCE_INPUT.format(name="Input%d", tool="%s", output="%s")
+        i = 1
+        while batch := list(islice(outputs, TEXT_BATCH)):
+            values = ((i + k, name, output) for k, (name, output) in enumerate(batch))
+            yield (line * len(batch)) % tuple(chain.from_iterable(values))
+            i += len(batch)
+
+        x, y = (v * scale for v, scale in zip(self.node_position, GRID))
+        yield TOOL_TAIL.format(x=x, y=y)
+
+
+def merge_tools(
+    name: str, tools: list[Tool], position: tuple[int, int] = (0, 0)
+) -> Tool:
+    """sMerge of every tool. That's a SourceMerge whenever it writes the first two
+    inputs exactly like pysion does, and a pysion Tool otherwise."""
+
+    if TEMPLATES:
+        first_two = list(islice(tool_outputs(tools), 2))
+        merge = SourceMerge(name, tools, position)
+        if repr(_merge(name, first_two, position)) == "".join(
+            merge._chunks(iter(first_two))
+        ):
+            return merge
+        _warn_mismatch("sMerge inputs")
+
+    return _merge(name, tool_outputs(tools), position)
+
+
+def tool_rows(
+    build: Callable[..., Tool],
+    template: ToolTemplate,
+    values: dict[str, Sequence],
+    precision: int | None = None,
+) -> list[Tool]:
+    """Returns the tools build(**row) makes for every row of values, which must
+    include a "name" column. That's a single ToolArray writing them through template
+    whenever it writes the first two rows exactly like pysion does, and one Tool per
+    row otherwise. With precision, floats are written with that many decimals."""
+
+    values = {k: v.tolist() if isinstance(v, ndarray) else v for k, v in values.items()}
+    rows = [dict(zip(values, row)) for row in islice(zip(*values.values()), 2)]
+
+    if TEMPLATES and len(rows) == 2:
+        sample = [build(**row) for row in rows]
+        first_two = {k: [row[k] for row in rows] for k in values}
+        array = ToolArray(template, first_two, sample[0].output)
+        if _probe(sample) == _probe([array]):
+            return [ToolArray(template, values, sample[0].output, precision)]
+        _warn_mismatch(f"{template.tool_id} rows")
+
+    if precision is not None:
+        floats = template.floats
+        values = {
+            k: rounded(v, precision).tolist() if k in floats else v
+            for k, v in values.items()
+        }
+
+    return [build(**dict(zip(values, row))) for row in zip(*values.values())]
+
+
+def tool_outputs(tools: Iterable[Tool]) -> Iterator[tuple[str, str]]:
+    """Name and output of every tool, counting every row of a ToolArray."""
+
+    for tool in tools:
+        if isinstance(tool, ToolArray):
+            for name in tool.names:
+                yield name, tool.output
+        else:
+            yield tool.name, tool.output
+
+
+def count_nodes(tool: Tool | Macro) -> int:
+    """Nodes a rendered geom is made of: every tool in it, counting every row of a
+    ToolArray, and the tools of a macro instead of the macro itself."""
+
+    if isinstance(tool, ToolArray):
+        return len(tool)
+    if isinstance(tool, Macro):
+        return sum(count_nodes(t) for t in tool.tools)
+
+    return 1
+
+
+def rounded(values: Sequence, precision: int | None) -> Sequence:
+    """Floats rounded to precision decimals, or left as they are without one."""
+
+    if precision is None:
+        return values
+
+    return np.round(np.asarray(values, dtype=np.float64), precision)
+
+
+def _merge(
+    name: str, outputs: Iterable[tuple[str, str]], position: tuple[int, int]
+) -> Tool:
+    merge = Tool("sMerge", name, position)
+    for i, (tool, output) in enumerate(outputs, start=1):
+        merge.add_source_input(f"Input{i}", tool, output)
+
+    return merge
+
+
+def _warn_mismatch(what: str) -> None:
+    if what in _MISMATCHES:
+        return
+
+    _MISMATCHES.add(what)
+    print(
+        f"Warning: {what} don't match the text pysion writes."
+        " Writing them with pysion instead, which is slower."
+    )
+
+
+def _points_text(points: list[tuple[float, float]]) -> str:
+    return POINT_SEPARATOR.join(POLYLINE_POINT % (repr(x), repr(y)) for x, y in points)
+
+
+def _float_spec(precision: int | None) -> str:
+    return "%r" if precision is None else f"%.{precision}f"
+
+
+def _escape(text: str) -> str:
+    return text.replace("%", "%%")
+
+
+def _probe(tools: list[Tool]) -> str:
+    return repr(Macro("FuPlotProbe", type="group").add_tools(*tools))
@@ -0,0 +1,92 @@
+from pandas import DataFrame
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
+import numpy as np
+
+"""Preparation of the data every geom draws: only its mapped columns, numbers as
+contiguous float64 arrays, and missing or infinite values handled by a single policy.
+Columns already stored that way are passed on without being copied, so wide tables
+aren't copied, or kept whole, once per geom."""
+
+
+NA_POLICIES = ("drop", "clip", "break")
+
+# aesthetics holding keys rather than quantities, which keep their dtype
+DISCRETE_AES = ("frame", "group")
+
+
+def prepare_data(
+    data: DataFrame, mapping: dict[str, str], policy: str, breaks: bool = False
+) -> DataFrame:
+    """Projects data onto the mapped columns, then applies the NaN/inf policy:
+    "drop" drops rows with a missing or infinite value, "clip" clips infinite values
+    to the column's finite range and drops rows with missing ones, and "break" keeps
+    them where the geom can break on them (lines do), dropping them otherwise."""
+
+    data = project(data, mapping)
+
+    if policy == "clip":
+        data = _clip_infinite(data)
+    elif policy == "break" and breaks:
+        return data
+
+    valid = finite_rows(data)
+    if valid.all():
+        return data
+
+    return data[valid]
+
+
+def project(data: DataFrame, mapping: dict[str, str]) -> DataFrame:
+    """The mapped columns of data, each one once. Numeric columns are viewed as
+    contiguous float64 arrays, which only copies those that aren't already."""
+
+    columns = {}
+    for aes, column in mapping.items():
+        if column is None or column in columns:
+            continue
+
+        values = data[column]
+        if (
+            aes not in DISCRETE_AES
+            and is_numeric_dtype(values)
+            and not is_bool_dtype(values)
+        ):
+            columns[column] = np.ascontiguousarray(
+                values.to_numpy(dtype=np.float64, copy=False)
+            )
+        else:
+            columns[column] = values.array
+
+    return DataFrame(columns, index=data.index, copy=False)
+
+
+def finite_rows(data: DataFrame) -> np.ndarray:
+    """Rows without missing values, nor infinite ones in float columns."""
+
+    valid = np.ones(len(data), dtype=bool)
+    for column in data:
+        values = data[column]
+        if values.dtype == np.float64:
+            valid &= np.isfinite(values.to_numpy())
+        else:
+            valid &= values.notna().to_numpy()
+
+    return valid
+
+
+def _clip_infinite(data: DataFrame) -> DataFrame:
+    columns = {}
+    for column in data:
+        values = data[column]
+        if values.dtype != np.float64 or not np.isinf(values.to_numpy()).any():
+            continue
+
+        array = values.to_numpy()
+        finite = array[np.isfinite(array)]
+        if len(finite):
+            columns[column] = np.clip(array, finite.min(), finite.max())
+
+    if not columns:
+        return data
+
+    return data.assign(**columns)
@@ -0,0 +1,121 @@
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from typing import Callable, Iterator, Protocol
+import logging
+import time
+
+"""Opt-in instrumentation of FuPlot's render pipeline."""
+
+
+logger = logging.getLogger("fuplot.profiling")
+
+
+class _ProfiledGeom(Protocol):
+    name: str
+    data: object
+
+
+@dataclass
+class GeomProfile:
+    name: str
+    seconds: float
+    rows: int
+    # tools in the rendered geom, set once it's rendered
+    nodes: int = 0
+    cached: bool = False
+
+
+@dataclass
+class RenderProfile:
+    """Structured report of a render: wall time per phase and per geom, rows
+    processed, nodes emitted and size of the output text."""
+
+    phases: dict[str, float] = field(default_factory=dict)
+    geoms: list[GeomProfile] = field(default_factory=list)
+    output_chars: int = 0
+
+    @property
+    def seconds(self) -> float:
+        return sum(self.phases.values())
+
+    @property
+    def rows(self) -> int:
+        return sum(g.rows for g in self.geoms)
+
+    @property
+    def nodes(self) -> int:
+        return sum(g.nodes for g in self.geoms)
+
+    def __str__(self) -> str:
+        lines = [f"Render took {self.seconds * 1000:.2f} ms"]
+        for phase, seconds in self.phases.items():
+            lines.append(f"  {phase:<12}{seconds * 1000:>10.2f} ms")
+        for g in self.geoms:
+            lines.append(
+                f"  {g.name:<12}{g.seconds * 1000:>10.2f} ms "
+                f"{g.rows:>9} rows {g.nodes:>9} nodes"
+                + (" (cached)" if g.cached else "")
+            )
+        lines.append(f"  output      {self.output_chars:>10} chars")
+
+        return "\n".join(lines)
+
+
+class Profiler:
+    """Records a RenderProfile. Once the render is done, the report is logged to the
+    "fuplot.profiling" logger at DEBUG level and passed to the callback, if any."""
+
+    def __init__(self, callback: Callable[[RenderProfile], None] | None = None):
+        self.report = RenderProfile()
+        self.callback = callback
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.report.phases[name] = self.report.phases.get(name, 0) + (
+                time.perf_counter() - start
+            )
+
+    @contextmanager
+    def geom(self, geom: _ProfiledGeom) -> Iterator[GeomProfile]:
+        profile = GeomProfile(name=geom.name, seconds=0, rows=len(geom.data))
+        start = time.perf_counter()
+        try:
+            yield profile
+        finally:
+            profile.seconds = time.perf_counter() - start
+            self.report.geoms.append(profile)
+
+    def output(self, chars: int) -> None:
+        self.report.output_chars += chars
+
+    def finish(self) -> RenderProfile:
+        logger.debug("%s", self.report)
+        if self.callback:
+            self.callback(self.report)
+
+        return self.report
+
+
+class _NullProfiler:
+    """Stands in for Profiler when profiling is disabled, doing as little as possible."""
+
+    _context = nullcontext()
+
+    def phase(self, name: str) -> nullcontext:
+        return self._context
+
+    def geom(self, geom: _ProfiledGeom) -> nullcontext:
+        return self._context
+
+    def output(self, chars: int) -> None:
+        pass
+
+    def finish(self) -> None:
+        return None
+
+
+NULL_PROFILER = _NullProfiler()
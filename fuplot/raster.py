@@ -0,0 +1,311 @@
+from .serialize import Loader
+from pysion import RGBA
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable
+from numpy import ndarray
+import hashlib
+import os
+import struct
+import tempfile
+import zlib
+import numpy as np
+
+"""Rasterization of dense geoms into a single image, which the comp loads with one
+Loader instead of one node per row. Coordinates are the canvas coordinates fusionize
+produces, y pointing up, and sizes are measured in canvas widths, like Fusion does.
+The canvas is drawn in bands of rows, in parallel threads."""
+
+
+RASTER_FORMATS = {".png": "PNGFormat", ".exr": "OpenEXRFormat"}
+
+# rows per band of the canvas drawn by a thread
+TILE_ROWS = 64
+
+# strongest single coverage, so transmittance never gets to log(0)
+_MAX_COVERAGE = 1 - 1e-6
+
+
+def rasterize_points(
+    x: ndarray,
+    y: ndarray,
+    diameter: ndarray,
+    opacity: float,
+    resolution: tuple[int, int],
+    threads: int | None = None,
+) -> ndarray:
+    """Alpha of antialiased disks, composited over each other with the given opacity,
+    as rows of pixels from the top of the canvas down."""
+
+    cx, cy = _to_pixels(x, y, resolution)
+    r = np.broadcast_to(np.asarray(diameter, dtype=np.float64), cx.shape) * (
+        resolution[0] / 2
+    )
+    finite = np.isfinite(cx) & np.isfinite(cy) & np.isfinite(r)
+    cx, cy, r = cx[finite], cy[finite], r[finite]
+
+    def band(rows: tuple[int, int]) -> ndarray:
+        top, bottom = rows
+        near = (cy + r + 1 >= top) & (cy - r - 1 < bottom)
+        return _disk_spans(
+            cx[near], cy[near] - top, r[near], opacity, (bottom - top, resolution[0])
+        )
+
+    # composited as transmittance, which multiplies, so its log adds up
+    return -np.expm1(_by_bands(band, resolution[1], threads))
+
+
+def rasterize_line(
+    x: ndarray,
+    y: ndarray,
+    thickness: float,
+    resolution: tuple[int, int],
+    threads: int | None = None,
+) -> ndarray:
+    """Alpha of an antialiased polyline through the points, thickness wide, as rows of
+    pixels from the top of the canvas down. The line breaks on missing points."""
+
+    px, py = _to_pixels(x, y, resolution)
+    r = thickness * resolution[0] / 2
+
+    # the line is drawn as disks a pixel apart along every segment between two
+    # finite points, and on every finite point that doesn't start one
+    finite = np.isfinite(px) & np.isfinite(py)
+    valid = finite[:-1] & finite[1:]
+    dx, dy = np.diff(px), np.diff(py)
+    steps = np.where(valid, np.maximum(np.ceil(np.hypot(dx, dy)), 1), 0).astype(
+        np.int64
+    )
+    segment = np.repeat(np.arange(len(steps)), steps)
+    t = (np.arange(steps.sum()) - np.repeat(np.cumsum(steps) - steps, steps)) / (
+        steps[segment]
+    )
+    ends = finite & ~np.r_[valid, False]
+
+    sx = np.r_[px[segment] + t * dx[segment], px[ends]]
+    sy = np.r_[py[segment] + t * dy[segment], py[ends]]
+
+    def band(rows: tuple[int, int]) -> ndarray:
+        top, bottom = rows
+        near = (sy + r + 1 >= top) & (sy - r - 1 < bottom)
+        return _disk_max(sx[near], sy[near] - top, r, (bottom - top, resolution[0]))
+
+    return _by_bands(band, resolution[1], threads)
+
+
+def raster_rgba(alpha: ndarray, color: RGBA) -> ndarray:
+    """Straight (not premultiplied) RGBA image of a single color."""
+
+    image = np.empty(alpha.shape + (4,), dtype=np.float32)
+    image[..., :3] = (color.red, color.green, color.blue)
+    image[..., 3] = alpha * color.alpha
+
+    return image
+
+
+def over(bottom: ndarray, top: ndarray) -> ndarray:
+    """Composites a straight RGBA image over another one."""
+
+    alpha = top[..., 3:] + bottom[..., 3:] * (1 - top[..., 3:])
+    color = top[..., :3] * top[..., 3:] + bottom[..., :3] * bottom[..., 3:] * (
+        1 - top[..., 3:]
+    )
+    image = np.empty_like(top)
+    image[..., :3] = np.divide(color, alpha, out=np.zeros_like(color), where=alpha > 0)
+    image[..., 3:] = alpha
+
+    return image
+
+
+def write_raster(image: ndarray, name: str, path: str | Path | None = None) -> Path:
+    """Writes the image as a PNG or an OpenEXR file, depending on the path's suffix.
+    Without a path, it goes to a PNG in the temporary directory, named after the
+    image's content. Returns the absolute path."""
+
+    if path is None:
+        digest = hashlib.sha1(image.tobytes()).hexdigest()[:12]
+        path = Path(tempfile.gettempdir()) / "fuplot" / f"{name}-{digest}.png"
+
+    path = Path(path).expanduser().absolute()
+    if path.suffix.lower() not in RASTER_FORMATS:
+        raise ValueError(
+            f'Invalid raster file "{path.name}". Use one of {tuple(RASTER_FORMATS)}.'
+        )
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.suffix.lower() == ".exr":
+        write_exr(path, image)
+    else:
+        write_png(path, image)
+
+    return path
+
+
+def raster_loader(
+    name: str,
+    image: ndarray,
+    path: str | Path | None = None,
+    position: tuple[int, int] = (0, 0),
+) -> Loader:
+    """Writes the image and returns a Loader reading it back."""
+
+    path = write_raster(image, name, path)
+    # PNGs are written straight, EXRs premultiplied
+    straight = path.suffix.lower() == ".png"
+
+    return Loader(name, path, RASTER_FORMATS[path.suffix.lower()], straight, position)
+
+
+def write_png(path: str | Path, image: ndarray) -> None:
+    """8 bit RGBA PNG, compressed with zlib."""
+
+    pixels = np.clip(np.rint(image * 255), 0, 255).astype(np.uint8)
+    height, width, _ = pixels.shape
+
+    # every row starts with its filter type, 0 for none
+    rows = np.zeros((height, width * 4 + 1), dtype=np.uint8)
+    rows[:, 1:] = pixels.reshape(height, -1)
+
+    def chunk(kind: bytes, body: bytes) -> bytes:
+        crc = zlib.crc32(kind + body) & 0xFFFFFFFF
+        return struct.pack(">I", len(body)) + kind + body + struct.pack(">I", crc)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+
+    Path(path).write_bytes(
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", header)
+        + chunk(b"IDAT", zlib.compress(rows.tobytes(), 6))
+        + chunk(b"IEND", b"")
+    )
+
+
+def write_exr(path: str | Path, image: ndarray) -> None:
+    """Half float RGBA OpenEXR, premultiplied as EXRs are. Requires OpenEXR."""
+
+    import OpenEXR
+    import Imath
+
+    premultiplied = image.copy()
+    premultiplied[..., :3] *= image[..., 3:]
+
+    height, width, _ = image.shape
+    header = OpenEXR.Header(width, height)
+    half = Imath.Channel(Imath.PixelType(Imath.PixelType.HALF))
+    header["channels"] = {c: half for c in "RGBA"}
+
+    exr = OpenEXR.OutputFile(str(path), header)
+    exr.writePixels(
+        {
+            c: premultiplied[..., i].astype(np.float16).tobytes()
+            for i, c in enumerate("RGBA")
+        }
+    )
+    exr.close()
+
+
+def _to_pixels(
+    x: ndarray, y: ndarray, resolution: tuple[int, int]
+) -> tuple[ndarray, ndarray]:
+    """Canvas coordinates to pixels, with rows counted from the top."""
+
+    px = np.asarray(x, dtype=np.float64) * resolution[0]
+    py = (1 - np.asarray(y, dtype=np.float64)) * resolution[1]
+
+    return px, py
+
+
+def _by_bands(
+    draw: Callable[[tuple[int, int]], ndarray], height: int, threads: int | None
+) -> ndarray:
+    bands = [(top, min(top + TILE_ROWS, height)) for top in range(0, height, TILE_ROWS)]
+
+    threads = threads or os.cpu_count() or 1
+    if threads == 1:
+        return np.vstack([draw(band) for band in bands])
+
+    with ThreadPoolExecutor(threads) as executor:
+        return np.vstack(list(executor.map(draw, bands)))
+
+
+def _disk_spans(
+    cx: ndarray, cy: ndarray, r: ndarray, opacity: float, shape: tuple[int, int]
+) -> ndarray:
+    """Log transmittance of disks over a band of pixels. Every row of a disk is a span
+    of fully covered pixels, added to a running difference along the row, and a
+    partially covered pixel at each end."""
+
+    height, width = shape
+    diff = np.zeros(height * (width + 1))
+    partial = np.zeros(height * width)
+    if not len(r):
+        return partial.reshape(shape)
+
+    base = np.floor(cy).astype(np.int64)
+    reach = int(np.ceil(r.max())) + 1
+
+    for dy in range(-reach, reach + 1):
+        row = base + dy
+        distance = np.abs(row + 0.5 - cy)
+
+        # fraction of the row's height inside the disk
+        vertical = np.clip(r + 0.5 - distance, 0, 1)
+        ok = (vertical > 0) & (row >= 0) & (row < height)
+        if not ok.any():
+            continue
+        row, distance, vertical = row[ok], distance[ok], vertical[ok]
+
+        # chord halfway through the part of the row inside the disk
+        middle = (np.maximum(distance - 0.5, 0) + np.minimum(distance + 0.5, r[ok])) / 2
+        half = np.sqrt(np.maximum(r[ok] ** 2 - middle**2, 0))
+        left, right = cx[ok] - half, cx[ok] + half
+
+        coverage = np.minimum(vertical * opacity, _MAX_COVERAGE)
+        weight = np.log1p(-coverage)
+
+        first = np.ceil(left)
+        last = np.floor(right)
+        start = np.clip(first, 0, width).astype(np.int64)
+        end = np.clip(last, 0, width).astype(np.int64)
+        full = end > start
+        np.add.at(diff, row[full] * (width + 1) + start[full], weight[full])
+        np.add.at(diff, row[full] * (width + 1) + end[full], -weight[full])
+
+        # ends of the span, or the single pixel a narrow span falls in
+        same = np.floor(left) == last
+        for pixel, fraction, valid in (
+            (np.floor(left), first - left, (first != left) & ~same),
+            (last, np.where(same, right - left, right - last), right != last),
+        ):
+            valid &= (pixel >= 0) & (pixel < width) & (fraction > 0)
+            np.add.at(
+                partial,
+                row[valid] * width + pixel[valid].astype(np.int64),
+                np.log1p(-np.minimum(fraction[valid] * coverage[valid], _MAX_COVERAGE)),
+            )
+
+    spans = np.cumsum(diff.reshape(height, width + 1), axis=1)[:, :width]
+
+    return spans + partial.reshape(shape)
+
+
+def _disk_max(cx: ndarray, cy: ndarray, r: float, shape: tuple[int, int]) -> ndarray:
+    """Coverage of the union of disks of radius r over a band of pixels."""
+
+    height, width = shape
+    coverage = np.zeros(height * width)
+    if not len(cx):
+        return coverage.reshape(shape)
+
+    col, row = np.floor(cx).astype(np.int64), np.floor(cy).astype(np.int64)
+    reach = int(np.ceil(r)) + 1
+
+    for dy in range(-reach, reach + 1):
+        for dx in range(-reach, reach + 1):
+            c, w = col + dx, row + dy
+            distance = np.hypot(c + 0.5 - cx, w + 0.5 - cy)
+            value = np.clip(r + 0.5 - distance, 0, 1)
+            ok = (value > 0) & (c >= 0) & (c < width) & (w >= 0) & (w < height)
+            np.maximum.at(coverage, w[ok] * width + c[ok], value[ok])
+
+    return coverage.reshape(shape)
@@ -0,0 +1,122 @@
+from .fusionize import categorical_levels
+from pandas import DataFrame, Timestamp
+from pandas.api.types import is_numeric_dtype
+import numpy as np
+
+"""Caching of the per-column statistics FuPlot uses to build its scales."""
+
+
+class ScaleIndex:
+    """Stores min and max values (or levels, for categorical columns) for every
+    (DataFrame, column) pair that has been mapped to an aesthetic, so each column is
+    only ever scanned once."""
+
+    def __init__(self) -> None:
+        # id(data) -> (data, {column: (min, max)})
+        # the DataFrame itself is kept so its id can't be reused by another object.
+        self._stats: dict[int, tuple[DataFrame, dict[str, tuple]]] = {}
+
+    def range(self, data: DataFrame, column: str) -> tuple:
+        """Returns the (min, max) values of a column, computing them only on first access."""
+
+        columns = self._columns(data)
+        if column not in columns:
+            columns[column] = self._compute_range(data[column])
+
+        return columns[column]
+
+    def levels(self, data: DataFrame, column: str) -> tuple:
+        """Returns the levels of a categorical column, in scale order, computing them
+        only on first access."""
+
+        columns = self._columns(data)
+        key = ("levels", column)
+        if key not in columns:
+            columns[key] = tuple(categorical_levels(data[column]))
+
+        return columns[key]
+
+    def has_levels(self, data, column: str) -> bool:
+        """Whether levels are stored for the column, e.g. for a categorical column of
+        a chunked source, which can't be inspected directly."""
+
+        return ("levels", column) in self._columns(data)
+
+    def missing(self, data, columns: list[str]) -> list[str]:
+        """Columns whose statistics haven't been computed yet."""
+
+        known = self._columns(data)
+
+        return [
+            c
+            for c in dict.fromkeys(columns)
+            if c not in known and ("levels", c) not in known
+        ]
+
+    def update(self, data, ranges: dict[str, tuple]) -> None:
+        """Stores statistics computed elsewhere, e.g. in a single pass over a chunked
+        source."""
+
+        self._columns(data).update(ranges)
+
+    def _columns(self, data) -> dict[str, tuple]:
+        entry = self._stats.get(id(data))
+        if entry is None or entry[0] is not data:
+            entry = (data, {})
+            self._stats[id(data)] = entry
+
+        return entry[1]
+
+    def invalidate(
+        self, data: DataFrame | None = None, column: str | None = None
+    ) -> None:
+        """Drops cached statistics. Should be called whenever data is modified in place.
+        With no arguments, the whole index is cleared."""
+
+        if data is None:
+            self._stats.clear()
+            return
+
+        entry = self._stats.get(id(data))
+        if entry is None or entry[0] is not data:
+            return
+
+        if column is None:
+            del self._stats[id(data)]
+            return
+
+        entry[1].pop(column, None)
+        entry[1].pop(("levels", column), None)
+
+    @staticmethod
+    def _compute_range(values) -> tuple:
+        if is_numeric_dtype(values):
+            array = values.to_numpy()
+            if array.dtype.kind == "f":
+                # infinite values are dropped or clipped to the finite range
+                finite = np.isfinite(array)
+                if finite.any() and not finite.all():
+                    array = array[finite]
+            return np.nanmin(array), np.nanmax(array)
+
+        return values.min(), values.max()
+
+
+def merge_range(a: tuple, b: tuple) -> tuple:
+    """(min, max) covering both ranges. When timezone naive and aware dates are mixed,
+    all of them are compared in UTC, naive ones being taken to be in UTC already."""
+
+    bounds = (*a, *b)
+    if len({d.tzinfo is None for d in bounds if isinstance(d, Timestamp)}) > 1:
+        bounds = tuple(_to_utc(d) for d in bounds)
+
+    return min(bounds), max(bounds)
+
+
+def _to_utc(date):
+    if not isinstance(date, Timestamp):
+        return date
+    if date.tzinfo is None:
+        return date.tz_localize("UTC")
+
+    return date.tz_convert("UTC")
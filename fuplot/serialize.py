@@ -0,0 +1,322 @@
+from pysion import Tool, Macro, Composition
+from numpy import ndarray
+from pathlib import Path
+from typing import BinaryIO, Callable, Iterable, TextIO
+from itertools import chain
+from contextvars import ContextVar
+from functools import cache
+import gzip
+import io
+import os
+import secrets
+import sys
+
+"""Writing of Fusion comp text to files and streams, one tool at a time."""
+
+
+# Fusion text around and between the tools of a comp, as pysion writes it, unless
+# comp_wrapper() finds otherwise
+COMP_HEADER = "{\n\tTools = ordered() {\n"
+COMP_SEPARATOR = ",\n"
+COMP_FOOTER = "\n\t}\n}"
+
+COMPRESSIONS = ("gzip", "zstd")
+SUFFIXES = {".gz": "gzip", ".zst": "zstd"}
+
+# frames a still image is held for, after the start of the comp
+HOLD_FRAMES = 1000000
+
+# stands in for text a tool leaves to the CompWriter, which can't appear in a comp
+DEFERRED_MARKER = "\x00"
+
+# text deferred by the tool a CompWriter is writing, None outside of one
+_deferred: ContextVar[list[Iterable[str]] | None] = ContextVar(
+    "fuplot_deferred", default=None
+)
+
+
+def deferred_text(chunks: Iterable[str]) -> str | None:
+    """While a CompWriter writes a tool, returns a marker for the tool to put in its
+    text instead of chunks, which the writer writes in its place one at a time. Large
+    tools use it so their text never sits in memory whole. Returns None otherwise,
+    and the tool writes the text itself."""
+
+    deferred = _deferred.get()
+    if deferred is None:
+        return None
+
+    deferred.append(chunks)
+
+    return DEFERRED_MARKER
+
+
+class BezierSpline(Tool):
+    """Animation curve for a single numeric input, with linear keys. pysion has no
+    modifier type for these, so its Fusion text is written here directly. Inputs
+    connect to it with add_source_input(input, spline.name, "Value")."""
+
+    def __init__(
+        self,
+        name: str,
+        times: ndarray,
+        values: ndarray,
+        position: tuple[int, int] = (0, 0),
+    ) -> None:
+        super().__init__("BezierSpline", name, position)
+        self.times = times
+        self.values = values
+
+    def __repr__(self) -> str:
+        key = "\t\t[%s] = { %r, Flags = { Linear = true } },\n"
+        keys = (key * len(self.times)) % tuple(
+            chain.from_iterable(zip(self.times.tolist(), self.values.tolist()))
+        )
+
+        return (
+            f"{self.name} = BezierSpline {{\n"
+            "\tSplineColor = { Red = 225, Green = 255, Blue = 0 },\n"
+            "\tNameSet = true,\n"
+            f"\tKeyFrames = {{\n{keys}\t}}\n"
+            "}"
+        )
+
+
+class Loader(Tool):
+    """Loader of a single image, held from the start of the comp on. pysion can't
+    write a Loader's clips, so its Fusion text is written here directly. post_multiply
+    multiplies color by alpha on load, for straight alpha files."""
+
+    def __init__(
+        self,
+        name: str,
+        filename: str | Path,
+        format_id: str,
+        post_multiply: bool = False,
+        position: tuple[int, int] = (0, 0),
+    ) -> None:
+        super().__init__("Loader", name, position)
+        self.filename = str(filename)
+        self.format_id = format_id
+        self.post_multiply = post_multiply
+
+    def __repr__(self) -> str:
+        filename = self.filename.replace("\\", "\\\\").replace('"', '\\"')
+
+        return (
+            f"{self.name} = Loader {{\n"
+            "\tClips = {\n"
+            "\t\tClip {\n"
+            '\t\t\tID = "Clip1",\n'
+            f'\t\t\tFilename = "{filename}",\n'
+            f'\t\t\tFormatID = "{self.format_id}",\n'
+            "\t\t\tStartFrame = -1,\n"
+            "\t\t\tLengthSetManually = true,\n"
+            "\t\t\tTrimIn = 0,\n"
+            "\t\t\tTrimOut = 0,\n"
+            "\t\t\tExtendFirst = 0,\n"
+            f"\t\t\tExtendLast = {HOLD_FRAMES},\n"
+            "\t\t\tLoop = 0,\n"
+            "\t\t\tAspectMode = 0,\n"
+            "\t\t\tDepth = 0,\n"
+            "\t\t\tTimeCode = 0,\n"
+            "\t\t\tGlobalStart = 0,\n"
+            "\t\t\tGlobalEnd = 0\n"
+            "\t\t}\n"
+            "\t},\n"
+            "\tInputs = {\n"
+            f"\t\tPostMultiplyByAlpha = Input {{ Value = {int(self.post_multiply)}, }},\n"
+            "\t},\n"
+            "}"
+        )
+
+
+class CompWriter:
+    """Streams tools into a Fusion .setting / .comp text. Tools are serialized and
+    written as soon as they're passed in, so the whole comp never sits in memory as
+    a single string, and the rows of large tools are written in batches, see
+    deferred_text()."""
+
+    def __init__(self, file: TextIO) -> None:
+        self.file = file
+        self.chars_written = 0
+        self.header, self.separator, self.footer = comp_wrapper()
+        self._first = True
+
+    def __enter__(self) -> "CompWriter":
+        self._write(self.header)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self._write(self.footer)
+
+    def write(self, *tools: Tool | Macro) -> None:
+        for tool in tools:
+            if not self._first:
+                self._write(self.separator)
+            self._first = False
+
+            token = _deferred.set([])
+            try:
+                text = repr(tool)
+                deferred = _deferred.get()
+            finally:
+                _deferred.reset(token)
+
+            parts = text.split(DEFERRED_MARKER)
+            for part, chunks in zip(parts, deferred):
+                self._write(part)
+                for chunk in chunks:
+                    self._write(chunk)
+            self._write(parts[-1])
+
+    def _write(self, text: str) -> None:
+        self.file.write(text)
+        self.chars_written += len(text)
+
+
+@cache
+def comp_wrapper() -> tuple[str, str, str]:
+    """Header, separator between two tools and footer of a comp, taken from the text
+    pysion writes for a Composition of two probe tools, so a comp written one tool at
+    a time reads exactly like one pysion writes whole."""
+
+    tools = [Tool("Background", f"FuPlotProbe{i}") for i in (1, 2)]
+    comp = Composition()
+    comp.add_tools(*tools)
+    text = repr(comp)
+
+    first, second = map(repr, tools)
+    start = text.find(first)
+    end = text.find(second, start + len(first))
+    if start < 0 or end < 0:
+        print(
+            "Warning: pysion doesn't write comps as expected."
+            " Written comps may differ from the ones render() copies."
+        )
+        return COMP_HEADER, COMP_SEPARATOR, COMP_FOOTER
+
+    return text[:start], text[start + len(first) : end], text[end + len(second) :]
+
+
+def output_compression(path: str | Path, compression: str | None) -> str | None:
+    """Checks the compression asked for, or infers it from a .gz or .zst suffix."""
+
+    if compression is None:
+        return SUFFIXES.get(Path(str(path)).suffix.lower())
+    if compression not in COMPRESSIONS:
+        raise ValueError(
+            f'Invalid compression "{compression}". Use one of {COMPRESSIONS}.'
+        )
+
+    return compression
+
+
+def open_output(
+    path: str | Path, compression: str | None = None
+) -> tuple[TextIO, Path | None]:
+    """Opens a path for writing comp text, optionally compressed with "gzip" or
+    "zstd". "-" stands for stdout. Files are written to a temporary sibling first,
+    which finish_output() moves into place."""
+
+    compress = _compressor(compression) if compression else None
+
+    if str(path) == "-":
+        if compress is None:
+            return sys.stdout, None
+        sys.stdout.flush()
+        raw = sys.stdout.buffer
+        return _CompressedText(compress(raw), raw, close_raw=False), None
+
+    path = Path(path)
+    fd, tmp_path = _create_sibling(path)
+
+    if compress is not None:
+        raw = os.fdopen(fd, "wb")
+        return _CompressedText(compress(raw), raw, close_raw=True), tmp_path
+
+    return os.fdopen(fd, "w", encoding="utf-8"), tmp_path
+
+
+def finish_output(
+    file: TextIO, path: str | Path, tmp_path: Path | None, success: bool
+) -> None:
+    """Atomically replaces path with the temporary file, or discards it on failure."""
+
+    if tmp_path is None:
+        if file is sys.stdout:
+            file.flush()
+        else:
+            # compressed stdout: closing ends the compressed stream, stdout stays open
+            file.close()
+        return
+
+    file.close()
+
+    if success:
+        os.replace(tmp_path, path)
+    else:
+        tmp_path.unlink(missing_ok=True)
+
+
+def _create_sibling(path: Path) -> tuple[int, Path]:
+    """Creates a new, uniquely named file next to path. Unlike mkstemp, which makes
+    files only their owner can read, it leaves permissions to the umask, like any
+    other file the output could have been written to directly."""
+
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0)
+    while True:
+        tmp_path = path.parent / f".{path.name}.{secrets.token_hex(4)}.tmp"
+        try:
+            return os.open(tmp_path, flags, 0o666), tmp_path
+        except FileExistsError:
+            continue
+
+
+class _CompressedText(io.TextIOWrapper):
+    """Text stream over a compressor writing into raw. Closing it ends the compressed
+    stream, then closes raw, or only flushes it if close_raw is False."""
+
+    def __init__(
+        self, stream: io.BufferedIOBase, raw: io.BufferedIOBase, close_raw: bool
+    ) -> None:
+        super().__init__(stream, encoding="utf-8")
+        self.raw_output = raw
+        self.close_raw = close_raw
+
+    def close(self) -> None:
+        if self.closed:
+            return
+
+        super().close()
+        if self.close_raw:
+            self.raw_output.close()
+        else:
+            self.raw_output.flush()
+
+
+def _compressor(compression: str) -> Callable[[BinaryIO], BinaryIO]:
+    """Wraps a binary stream in a compressor that leaves it open when closed. zstd
+    comes from the standard library on Python 3.14 and up, or from the zstandard
+    package otherwise."""
+
+    if compression == "gzip":
+        # no timestamp in the header, so the same comp compresses to the same bytes
+        return lambda raw: gzip.GzipFile(fileobj=raw, mode="wb", mtime=0)
+
+    try:
+        from compression import zstd
+
+        return lambda raw: zstd.ZstdFile(raw, "w")
+    except ImportError:
+        pass
+
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError(
+            'zstd compression needs the "zstandard" package before Python 3.14. '
+            'Install it with "pip install fuplot[zstd]".'
+        ) from e
+
+    return lambda raw: zstandard.ZstdCompressor().stream_writer(raw, closefd=False)
@@ -0,0 +1,316 @@
+from .fusionize import fusionize_array, is_categorical, categorical_levels
+from .scales import ScaleIndex, merge_range
+from typing import Callable, Iterable, Iterator
+from pathlib import Path
+from pandas import DataFrame, CategoricalDtype
+from numpy import ndarray
+import pandas as pd
+import numpy as np
+
+"""Data sources too large to load at once. They're read chunk by chunk, only ever
+reading the mapped columns: once to compute scales, then once more to reduce every
+chunk to what can actually be seen on the canvas."""
+
+
+WEIGHT_COLUMN = "_fuplot_weight"
+
+# aesthetics that keep every row of a source from being reduced
+KEEP_ALL = ("frame", "order")
+
+
+class ChunkedSource:
+    """A table read one chunk at a time. open_chunks receives the list of columns to
+    read and returns a fresh iterable of DataFrames every time it's called, so the
+    source can be read more than once. Use one of the from_* constructors."""
+
+    def __init__(
+        self,
+        open_chunks: Callable[[list[str]], Iterable[DataFrame]],
+        columns: list[str],
+    ) -> None:
+        self.open_chunks = open_chunks
+        self.columns = list(columns)
+
+    @classmethod
+    def from_csv(
+        cls, path: str | Path, chunksize: int = 1_000_000, **kwargs
+    ) -> "ChunkedSource":
+        """Reads a csv file with pandas. Extra arguments are passed to pd.read_csv."""
+
+        columns = pd.read_csv(path, nrows=0, **kwargs).columns
+
+        def open_chunks(usecols: list[str]) -> Iterable[DataFrame]:
+            options = dict(kwargs)
+            if isinstance(options.get("parse_dates"), list):
+                # read_csv refuses to parse dates in columns it isn't reading
+                options["parse_dates"] = [
+                    c for c in options["parse_dates"] if c in usecols
+                ]
+
+            return pd.read_csv(path, usecols=usecols, chunksize=chunksize, **options)
+
+        return cls(open_chunks, columns)
+
+    @classmethod
+    def from_parquet(
+        cls, path: str | Path, batch_size: int = 1_000_000
+    ) -> "ChunkedSource":
+        """Reads a parquet file in record batches. Requires pyarrow."""
+
+        import pyarrow.parquet as pq
+
+        def open_chunks(columns: list[str]) -> Iterator[DataFrame]:
+            file = pq.ParquetFile(path)
+            for batch in file.iter_batches(batch_size=batch_size, columns=columns):
+                yield batch.to_pandas()
+
+        return cls(open_chunks, pq.read_schema(path).names)
+
+    @classmethod
+    def from_dataset(cls, dataset, batch_size: int = 1_000_000) -> "ChunkedSource":
+        """Reads a pyarrow dataset in record batches."""
+
+        def open_chunks(columns: list[str]) -> Iterator[DataFrame]:
+            for batch in dataset.to_batches(columns=columns, batch_size=batch_size):
+                yield batch.to_pandas()
+
+        return cls(open_chunks, dataset.schema.names)
+
+    def __contains__(self, column: str) -> bool:
+        return column in self.columns
+
+    def chunks(self, columns: list[str]) -> Iterator[DataFrame]:
+        for chunk in self.open_chunks(list(dict.fromkeys(columns))):
+            if len(chunk):
+                yield chunk
+
+    def ranges(self, columns: list[str]) -> dict:
+        """Returns the (min, max) values of every column, in a single pass. Categorical
+        columns get their levels instead, under a ("levels", column) key, like
+        ScaleIndex.levels stores them."""
+
+        ranges: dict = {}
+        levels: dict[str, dict] = {}
+        # columns with a pandas categorical dtype keep the order of their categories
+        ordered: set[str] = set()
+        for chunk in self.chunks(columns):
+            for column in columns:
+                values = chunk[column]
+                if values.isna().all():
+                    continue
+
+                if is_categorical(values):
+                    if isinstance(values.dtype, CategoricalDtype):
+                        ordered.add(column)
+                    seen = levels.setdefault(column, {})
+                    seen.update(dict.fromkeys(categorical_levels(values, None)))
+                    continue
+
+                min_v, max_v = ScaleIndex._compute_range(values)
+                if column in ranges:
+                    min_v, max_v = merge_range((min_v, max_v), ranges[column])
+                ranges[column] = (min_v, max_v)
+
+        for column, seen in levels.items():
+            ranges.pop(column, None)
+            if column in ordered:
+                ranges[("levels", column)] = tuple(seen)
+            else:
+                ranges[("levels", column)] = tuple(
+                    categorical_levels(pd.Series(list(seen), dtype=object))
+                )
+
+        for column in columns:
+            if column not in levels:
+                ranges.setdefault(column, (np.nan, np.nan))
+
+        return ranges
+
+
+def reduce_source(
+    source: ChunkedSource,
+    layers: list[tuple[str | None, dict[str, str]]],
+    mapping_scales: dict[str, tuple],
+    resolution: tuple[int, int],
+) -> list[tuple[DataFrame, dict[str, str]]]:
+    """Reads the source once, reducing every chunk for each (reduction, mapping) pair.
+    Reduced chunks are merged into the running result and reduced again, so memory
+    never holds more than one chunk plus what's visible on the canvas. Returns the
+    data and mapping each geom should be built with."""
+
+    columns = [v for _, mapping in layers for v in mapping.values() if v is not None]
+    results: list[DataFrame | None] = [None] * len(layers)
+    mappings = [dict(mapping) for _, mapping in layers]
+
+    for chunk in source.chunks(columns):
+        for i, (reduction, mapping) in enumerate(layers):
+            used = list(dict.fromkeys(v for v in mapping.values() if v is not None))
+            part = chunk[used]
+
+            reducer = REDUCTIONS.get(reduction)
+            if reducer is None or any(mapping.get(aes) is not None for aes in KEEP_ALL):
+                # animated geoms need every row of every frame, and lines following
+                # the order aesthetic don't run along pixel columns
+                results[i] = _concat(results[i], part)
+                continue
+
+            part, mappings[i] = reducer(
+                _concat(results[i], part), mapping, mapping_scales, resolution
+            )
+            results[i] = part
+
+    return [
+        (data if data is not None else DataFrame(columns=columns), mapping)
+        for data, mapping in zip(results, mappings)
+    ]
+
+
+def _concat(reduced: DataFrame | None, chunk: DataFrame) -> DataFrame:
+    if reduced is None:
+        return chunk.reset_index(drop=True)
+
+    return pd.concat((reduced, chunk), ignore_index=True)
+
+
+def _to_pixels(
+    data: DataFrame,
+    mapping: dict[str, str],
+    aes: str,
+    mapping_scales: dict[str, tuple],
+    n_pixels: int,
+) -> ndarray:
+    fu = fusionize_array(data[mapping[aes]], mapping_scales[aes])
+    with np.errstate(invalid="ignore"):
+        return np.round(fu * n_pixels)
+
+
+def _reduce_points(
+    data: DataFrame,
+    mapping: dict[str, str],
+    mapping_scales: dict[str, tuple],
+    resolution: tuple[int, int],
+) -> tuple[DataFrame, dict[str, str]]:
+    """Keeps the first row falling on every pixel."""
+
+    px = _to_pixels(data, mapping, "x", mapping_scales, resolution[0])
+    py = _to_pixels(data, mapping, "y", mapping_scales, resolution[1])
+    valid = np.flatnonzero(~(np.isnan(px) | np.isnan(py)))
+
+    key = px[valid].astype(np.int64) * (resolution[1] + 1) + py[valid]
+    _, first = np.unique(key, return_index=True)
+
+    return data.iloc[np.sort(valid[first])].reset_index(drop=True), mapping
+
+
+def _reduce_line(
+    data: DataFrame,
+    mapping: dict[str, str],
+    mapping_scales: dict[str, tuple],
+    resolution: tuple[int, int],
+) -> tuple[DataFrame, dict[str, str]]:
+    """Keeps the first, last, lowest and highest point of every pixel column of every
+    series, like the "minmax" decimation, so the reduced line rasterizes to the same
+    pixels. Series are told apart by group and color, and keep their first row."""
+
+    px = _to_pixels(data, mapping, "x", mapping_scales, resolution[0])
+    x = fusionize_array(data[mapping["x"]], mapping_scales["x"])
+    y = fusionize_array(data[mapping["y"]], mapping_scales["y"])
+    valid = np.flatnonzero(~(np.isnan(px) | np.isnan(y)))
+    series = _series_key(data, mapping)[valid]
+    px, x, y = px[valid], x[valid], y[valid]
+    if not len(valid):
+        return data.iloc[valid], mapping
+
+    # sorting by series and column, then x or y, puts each column's extremes at its
+    # ends
+    by_x = np.lexsort((x, px, series))
+    by_y = np.lexsort((y, px, series))
+
+    column = px[by_x]
+    split = (np.diff(column) != 0) | (np.diff(series[by_x]) != 0)
+    starts = np.r_[0, np.flatnonzero(split) + 1]
+    ends = np.r_[starts[1:], len(column)] - 1
+
+    # a series' first row decides its color
+    _, firsts = np.unique(series, return_index=True)
+
+    kept = np.unique(
+        np.concatenate((by_x[starts], by_x[ends], by_y[starts], by_y[ends], firsts))
+    )
+
+    return data.iloc[valid[kept]].reset_index(drop=True), mapping
+
+
+def _series_key(data: DataFrame, mapping: dict[str, str]) -> ndarray:
+    """Index of every row's (group, color) pair, missing values included."""
+
+    key = np.zeros(len(data), dtype=np.int64)
+    for aes in ("group", "color"):
+        if mapping.get(aes) is None:
+            continue
+
+        codes, levels = pd.factorize(data[mapping[aes]], use_na_sentinel=False)
+        key = key * max(len(levels), 1) + codes
+
+    return key
+
+
+def _reduce_bins(
+    data: DataFrame,
+    mapping: dict[str, str],
+    mapping_scales: dict[str, tuple],
+    resolution: tuple[int, int],
+    aesthetics: tuple[str, ...] = ("x", "y"),
+) -> tuple[DataFrame, dict[str, str]]:
+    """Collapses rows falling on the same pixel into one, adding up their weights.
+    Binned geoms then count the weight column instead of rows. Only the binned
+    aesthetics are kept, since other columns can't be merged."""
+
+    pixels = [
+        _to_pixels(data, mapping, aes, mapping_scales, resolution[i])
+        for i, aes in enumerate(aesthetics)
+    ]
+    valid = np.flatnonzero(~np.any(np.isnan(pixels), axis=0))
+
+    key = pixels[0][valid].astype(np.int64)
+    if len(pixels) > 1:
+        key = key * (resolution[1] + 1) + pixels[1][valid]
+
+    weight = mapping.get("weight")
+    if weight is None:
+        weights = np.ones(len(valid))
+    else:
+        weights = np.asarray(data[weight], dtype=np.float64)[valid]
+
+    # rows merged from previous chunks carry their accumulated weight
+    if WEIGHT_COLUMN in data:
+        carried = data[WEIGHT_COLUMN].to_numpy(dtype=np.float64)[valid]
+        weights = np.where(np.isnan(carried), weights, carried)
+
+    _, first, inverse = np.unique(key, return_index=True, return_inverse=True)
+    columns = list(dict.fromkeys(mapping[aes] for aes in aesthetics))
+
+    reduced = data[columns].iloc[valid[first]].reset_index(drop=True)
+    reduced[WEIGHT_COLUMN] = np.bincount(inverse.ravel(), weights=weights)
+
+    return reduced, {
+        **{aes: mapping[aes] for aes in aesthetics},
+        "weight": WEIGHT_COLUMN,
+    }
+
+
+def _reduce_histogram(
+    data: DataFrame,
+    mapping: dict[str, str],
+    mapping_scales: dict[str, tuple],
+    resolution: tuple[int, int],
+) -> tuple[DataFrame, dict[str, str]]:
+    return _reduce_bins(data, mapping, mapping_scales, resolution, ("x",))
+
+
+REDUCTIONS = {
+    "points": _reduce_points,
+    "line": _reduce_line,
+    "bins": _reduce_bins,
+    "histogram": _reduce_histogram,
+}
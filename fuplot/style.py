@@ -1,6 +1,7 @@
 from pysion import RGBA
 from types import SimpleNamespace
-
+from numpy import ndarray
+import numpy as np
 
 COLORS = SimpleNamespace(
     black=RGBA(),
@@ -10,3 +11,30 @@ COLORS = SimpleNamespace(
     green=RGBA(0, 1),
     blue=RGBA(0, 0, 1),
 )
+
+
+# palettes for categorical aesthetics, cycled through when there are more levels
+PALETTES = SimpleNamespace(
+    # Okabe & Ito's colorblind safe palette, black left out
+    okabe_ito=(
+        RGBA(0.902, 0.624, 0),
+        RGBA(0.337, 0.706, 0.914),
+        RGBA(0, 0.620, 0.451),
+        RGBA(0.941, 0.894, 0.259),
+        RGBA(0, 0.447, 0.698),
+        RGBA(0.835, 0.369, 0),
+        RGBA(0.800, 0.475, 0.655),
+    ),
+    primaries=(COLORS.red, COLORS.green, COLORS.blue),
+)
+
+
+def palette_colors(codes, palette: tuple[RGBA, ...]) -> ndarray:
+    """Picks a color for every level code, as rows of red, green, blue and alpha.
+    Codes of -1, for missing values, get a transparent color."""
+
+    colors = np.array([(c.red, c.green, c.blue, c.alpha) for c in palette])
+    picked = colors[np.asarray(codes) % len(palette)]
+    picked[np.asarray(codes) < 0] = 0
+
+    return picked
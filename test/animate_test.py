@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+import re
+from fuplot import FuPlot, RGBA, aes
+
+
+def main() -> None:
+    # three countries over five years, one node graph for all of them
+    years = np.repeat(np.arange(2000, 2005), 3)
+    data = pd.DataFrame(
+        {
+            "year": years,
+            "country": ["a", "b", "c"] * 5,
+            "gdp": np.tile([1.0, 2.0, 3.0], 5) * (years - 1995),
+            "population": np.tile([3.0, 1.0, 2.0], 5) + (years - 2000) / 2,
+        }
+    )
+
+    plot = FuPlot(data, aes("gdp", "population", group="country", frame="year"))
+    plot.geom_point(fill=RGBA(0.2, 1, 0.4))
+    plot.geom_line(mapping=aes(x="year", y="gdp"))
+    summarize("points and lines", plot.render())
+
+    plot = FuPlot(data, aes("country", "gdp", frame="year"), frame_duration=12)
+    plot.geom_col(fill=RGBA(1, 0.2, 0.4))
+    summarize("columns", plot.render())
+
+
+def summarize(name: str, text: str) -> None:
+    splines = re.findall(r"= BezierSpline \{.*?KeyFrames = \{(.*?)\t\}", text, re.S)
+    times = sorted({int(t) for keys in splines for t in re.findall(r"\[(\d+)\]", keys)})
+    print(f"{name}: {len(splines)} splines, keyed at {times}")
+
+
+if __name__ == "__main__":
+    main()
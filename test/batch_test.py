@@ -0,0 +1,27 @@
+from pathlib import Path
+import pandas as pd
+import tempfile
+from fuplot import FuPlot, RGBA, aes, render_many
+
+
+def build(data: pd.DataFrame) -> FuPlot:
+    plot = FuPlot(data, aes("distance", "orbital_period"), width=0.6)
+    plot.geom_point(fill=RGBA(0.2, 1, 0.4), opacity=0.5)
+
+    return plot
+
+
+def main() -> None:
+    data = pd.read_csv(Path("test_data") / "planets.csv")
+    # "radial velocity" gets a file name of its own next to "Radial Velocity"
+    data.loc[data.index[:5], "method"] = "radial velocity"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = render_many(data, "method", build, tmp, max_workers=2)
+
+        for path in paths:
+            print(f"{path.name}: {path.stat().st_size} bytes")
+
+
+if __name__ == "__main__":
+    main()
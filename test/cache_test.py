@@ -0,0 +1,41 @@
+from pathlib import Path
+import pandas as pd
+import tempfile
+from fuplot import FuPlot, RGBA, RenderCache, aes
+
+
+def main() -> None:
+    data = pd.read_csv(Path("test_data") / "planets.csv")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_file = Path(tmp) / "planets.cache"
+        raster_file = Path(tmp) / "points.png"
+
+        plot = FuPlot(data, aes("distance", "orbital_period"), width=0.6)
+        plot.render_cache = RenderCache(path=cache_file)
+        plot.geom_point(fill=RGBA(0.2, 1, 0.4), opacity=0.5)
+        plot.geom_point(backend="raster", raster_file=raster_file)
+
+        # the second render only reads the cache
+        first = plot.render()
+        print("same:", plot.render() == first, plot.render_cache)
+
+        # another geom only misses once
+        plot.geom_bin2d(bins=10, fill=RGBA(1, 0.2, 0.4))
+        plot.render()
+        print("new geom:", plot.render_cache)
+
+        # entries persist across plots using the same file
+        plot = plot.copy()
+        plot.render_cache = RenderCache(path=cache_file)
+        plot.render()
+        print("reloaded:", plot.render_cache)
+
+        # a cached raster whose image is gone is rendered again
+        raster_file.unlink()
+        plot.render()
+        print("image deleted:", plot.render_cache, raster_file.exists())
+
+
+if __name__ == "__main__":
+    main()
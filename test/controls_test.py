@@ -0,0 +1,47 @@
+from pathlib import Path
+import pandas as pd
+import re
+from fuplot import FuPlot, RGBA, aes
+
+
+def main() -> None:
+    data = pd.read_csv(Path("test_data") / "planets.csv")
+
+    for controls in (False, True):
+        plot = FuPlot(data, aes("distance", "orbital_period"), width=0.6)
+        plot.geom_point(fill=RGBA(0.2, 1, 0.4), backend="shape", controls=controls)
+        text = plot.render()
+        if not controls:
+            plain = text
+            continue
+
+        # controls only add a node holding them and the transform reading them
+        print("added:", sorted(tools(text).keys() - tools(plain).keys()))
+        print(f"{len(rows(text))} rows unchanged:", rows(text) == rows(plain))
+        print("transform:", expressions(text, "GeomPointPlot1"))
+        print("base point:", expressions(text, "GeomPointShape1"))
+
+    data = pd.read_csv(Path("test_data") / "pop_co2.csv").head(10)
+
+    plot = FuPlot(data, aes("country", "co2_transport"), width=0.6)
+    plot.geom_col(fill=RGBA(1, 0.2, 0.4), controls=True)
+    print("columns:", expressions(plot.render(), "GeomColPlot1"))
+
+
+def tools(text: str) -> dict[str, str]:
+    """Every tool's name and type."""
+
+    return dict(re.findall(r"^(\w+) = (\w+) \{", text, re.M))
+
+
+def rows(text: str) -> list[str]:
+    return re.findall(r"^\w+Transform\d+ = sTransform \{.*?\n\}", text, re.M | re.S)
+
+
+def expressions(text: str, tool: str) -> list[str]:
+    body = re.search(rf"^{tool} = \w+ \{{(.*?)\n\}}", text, re.M | re.S)[1]
+    return re.findall(r'Expression = "([^"]*)"', body)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+import numpy as np
+from fuplot.decimate import lttb, minmax, rdp, decimation_error
+
+# a random walk with a million points, drawn over 1920 pixel columns
+rng = np.random.default_rng(0)
+x = np.linspace(0, 1920, 1_000_000)
+y = np.cumsum(rng.normal(size=len(x)))
+
+for name, kept in [
+    ("lttb", lttb(x, y, 2000)),
+    ("minmax", minmax(x, y, 1920)),
+    ("rdp", rdp(x, y, 2000)),
+]:
+    print(f"{name}: kept {len(kept)} points, error {decimation_error(x, y, kept):.2f}")
+
+# a spiral, whose x goes back and forth, is measured along the path
+t = np.linspace(0, 20 * np.pi, 100_000)
+x, y = t * np.cos(t), t * np.sin(t)
+kept = rdp(x, y, 2000)
+print(f"spiral rdp: kept {len(kept)} points, error {decimation_error(x, y, kept):.2f}")
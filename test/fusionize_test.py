@@ -1,14 +1,18 @@
 import pandas as pd
 from pathlib import Path
 from fuplot.fusionize import fusionize, dim_to_scale, fusionize_categorical_to_position
+from fuplot.fusionize import resolution_precision
 
-data = pd.read_csv(Path("test_data") / "IVV.csv")
-data.Date = pd.to_datetime(data.Date).apply(lambda v: v.value)
+data = pd.read_csv(Path("test_data") / "IVV.csv", parse_dates=["Date"])
 
 print("max:", max(data["Adj Close"]), "\nmin:", min(data["Adj Close"]))
 
 print(fusionize(data["Adj Close"], scale_data=(200, 500), scale_plot=(0.2, 0.6)))
 
+print(fusionize(data.Date, scale_data=("2018-01-01", None)))
+
 print(dim_to_scale(0.8 / 4, 0.25))
 
 print(fusionize_categorical_to_position(10))
+
+print(resolution_precision((1920, 1080)), resolution_precision((3840, 2160)))
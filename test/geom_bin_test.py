@@ -0,0 +1,34 @@
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from fuplot import FuPlot, RGBA, aes, GraphBudget
+
+
+def main() -> None:
+    data = pd.read_csv(Path("test_data") / "planets.csv")
+    data = data.dropna()
+
+    plot = FuPlot(data, width=0.6)
+    plot.geom_histogram(mapping=aes(x="distance"), bins=20, fill=RGBA(1, 0.2, 0.4))
+    plot.render()
+
+
+def main2() -> None:
+    # a million rows still make a graph of at most 40 x 40 bins
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame({"x": rng.normal(size=1_000_000)})
+    data["y"] = data["x"] + rng.normal(size=len(data))
+
+    plot = FuPlot(data, aes("x", "y"))
+    plot.geom_bin2d(bins=40, fill=RGBA(0.2, 1, 0.4))
+    plot.geom_hex(bins=40, fill=RGBA(0.2, 0.4, 1))
+    plot.budget = GraphBudget(max_nodes=500)
+
+    for name, nodes, n_bytes in plot.estimate():
+        print(f"{name}: {nodes} nodes, {n_bytes} bytes")
+    plot.render()
+
+
+if __name__ == "__main__":
+    main()
+    main2()
@@ -1,14 +1,15 @@
 from pathlib import Path
+import numpy as np
 import pandas as pd
+import re
+import tempfile
 from fuplot import FuPlot, aes, RGBA
+from fuplot.sources import ChunkedSource
 
 
 # MAIN ==================================================
 def main():
-    data = pd.read_csv(Path("test_data") / "IVV.csv")
-
-    # clean dates
-    data.Date = pd.to_datetime(data.Date).apply(lambda v: v.value)
+    data = pd.read_csv(Path("test_data") / "IVV.csv", parse_dates=["Date"])
 
     plot = FuPlot(data, aes("Date"), width=0.6, height=0.5)
     plot.geom_line(mapping=aes(y="High"), color=RGBA(0.2, 1, 0.5))
@@ -17,8 +18,75 @@ def main():
         mapping=aes(y="Adj Close"), color=RGBA(0.35, 0.35, 1), thickness=0.002
     )
 
+    # timezone aware dates share the scale of naive ones
+    aware = data.assign(Date=data.Date.dt.tz_localize("America/New_York"))
+    plot.geom_line(aware, aes(y="Open"), color=RGBA(1, 1, 0.2))
+
     plot.render()
 
 
+def main2():
+    data = pd.read_csv(Path("test_data") / "IVV.csv", parse_dates=["Date"])
+
+    # long format: one series per price column, drawn by a single geom
+    prices = data.melt("Date", ["High", "Low", "Adj Close"], "price", "value")
+
+    plot = FuPlot(prices, aes("Date", "value"), width=0.6, height=0.5)
+    plot.geom_line(mapping=aes(color="price"), thickness=0.002)
+
+    plot.render()
+
+    # the same series read 500 rows at a time, each one reduced on its own
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "prices.csv"
+        prices.to_csv(path, index=False)
+        source = ChunkedSource.from_csv(path, chunksize=500, parse_dates=["Date"])
+
+        plot = FuPlot(source, aes("Date", "value"), width=0.6, height=0.5)
+        plot.geom_line(mapping=aes(color="price"), thickness=0.002)
+
+        plot.render()
+        print("series:", plot.mapping_scales["color"])
+
+
+def main3():
+    # series "b" only shows up from step 3 on, and is revealed in step with "a"
+    data = pd.DataFrame(
+        {
+            "x": [1, 2, 3, 4, 3, 4],
+            "y": [1, 2, 1, 2, 5, 6],
+            "step": [1, 2, 3, 4, 3, 4],
+            "series": ["a", "a", "a", "a", "b", "b"],
+        }
+    )
+
+    plot = FuPlot(data, aes("x", "y", group="series", frame="step"))
+    plot.geom_line()
+
+    text = plot.render()
+    print("a keys:", keyframes(text, "PlotLine1WriteLength"))
+    print("b keys:", keyframes(text, "PlotLine1Run2WriteLength"))
+
+
+def main4():
+    # decimated down to 20 points, the line still gets a key for each of 100 steps
+    data = pd.DataFrame({"x": range(100), "y": np.sin(np.arange(100) / 5)})
+    data["step"] = data.x
+
+    plot = FuPlot(data, aes("x", "y", frame="step"))
+    plot.geom_line(decimate="lttb", max_points=20)
+
+    keys = keyframes(plot.render(), "PlotLine1WriteLength")
+    print(f"{len(keys)} keys, last at {keys[-1]}")
+
+
+def keyframes(text: str, spline: str) -> list[tuple[int, float]]:
+    keys = text[text.index(f"{spline} = BezierSpline") :].split("\n}")[0]
+    return [(int(t), float(v)) for t, v in re.findall(r"\[(\d+)\] = \{ ([^,]+),", keys)]
+
+
 if __name__ == "__main__":
     main()
+    main2()
+    main3()
+    main4()
@@ -1,5 +1,6 @@
 from pathlib import Path
 import pandas as pd
+import re
 from fuplot import FuPlot, RGBA, aes
 
 
@@ -29,5 +30,34 @@ def main2() -> None:
     plot.render()
 
 
+def main3() -> None:
+    # every mass is missing, so the "drop" policy leaves the layer without rows
+    data = pd.read_csv(Path("test_data") / "planets.csv")
+    data["mass"] = float("nan")
+
+    for backend in ("shape", "mask", "raster"):
+        plot = FuPlot(data, aes("distance", "orbital_period"), width=0.6)
+        plot.geom_point(mapping=aes(y="mass"), backend=backend)
+        plot.render()
+        print(f"{backend}: {len(plot.geoms[0].data)} points")
+
+
+def main4() -> None:
+    # sizes follow their points when points are sorted by x: the point at x=1 is the
+    # middle sized one
+    data = pd.DataFrame({"x": [3, 1, 2], "y": [1, 1, 1], "size": [10, 20, 30]})
+
+    plot = FuPlot(data, aes("x", "y", size="size"))
+    plot.geom_point(backend="shape")
+    transforms = re.findall(
+        r"XOffset = Input \{ Value = ([^,]+), \},.*?XSize = Input \{ Value = ([^,]+),",
+        plot.render(),
+        re.S,
+    )
+    print("x, size:", [(round(float(x), 3), round(float(s), 4)) for x, s in transforms])
+
+
 if __name__ == "__main__":
     main2()
+    main3()
+    main4()
@@ -0,0 +1,69 @@
+from pathlib import Path
+import pandas as pd
+import fuplot.geometry as geometry
+from fuplot import FuPlot, aes, RGBA
+
+
+def plots() -> list[FuPlot]:
+    planets = pd.read_csv(Path("test_data") / "planets.csv").dropna()
+    prices = pd.read_csv(Path("test_data") / "IVV.csv", parse_dates=["Date"])
+    by_method = planets.groupby("method", as_index=False).number.sum()
+
+    points = aes("distance", "orbital_period", size="mass")
+    return [
+        FuPlot(planets).geom_point(mapping=points, backend="mask"),
+        FuPlot(planets).geom_point(mapping=points, backend="shape"),
+        FuPlot(by_method, aes("method", "number")).geom_col(fill=RGBA(0.5, 0.5, 1)),
+        FuPlot(planets, aes("distance", "orbital_period")).geom_bin2d(bins=10),
+        FuPlot(planets, aes("distance", "orbital_period")).geom_hex(bins=10),
+        FuPlot(planets, aes("distance")).geom_histogram(bins=20),
+        FuPlot(prices, aes("Date", "High")).geom_line(),
+    ]
+
+
+def main() -> None:
+    # every row written through a template must read exactly as pysion writes it.
+    # With a precision, templates write fixed decimals instead, so it's left out here
+    for templated, written in zip(plots(), plots()):
+        geometry.TEMPLATES = True
+        text = templated.render()
+        geometry.TEMPLATES = False
+        expected = written.render()
+        geometry.TEMPLATES = True
+
+        print(
+            f"{templated.layers[0].geom.__name__}: same as pysion: {text == expected}"
+        )
+
+
+def main2() -> None:
+    # templates only write rows when they match pysion. If pysion writes tools some
+    # other way, every row falls back to pysion, which is much slower: fail loudly
+    for plot in plots():
+        plot.render()
+        geom = plot.geoms[0]
+        rendered = geom.render(
+            plot.width, plot.height, plot.mapping_scales, plot.resolution
+        )
+        n = templated(rendered)
+        print(f"{geom.name}: {n} tools written through templates")
+        if not n:
+            raise RuntimeError(f"{geom.name} isn't written through templates.")
+
+
+def templated(tool) -> int:
+    """Tools of a rendered geom written through a template."""
+
+    if isinstance(tool, (geometry.ToolArray, geometry.SourceMerge)):
+        return 1
+    if isinstance(tool, geometry.PolylineMask):
+        return tool._points is not None
+    if isinstance(tool, geometry.Macro):
+        return sum(templated(t) for t in tool.tools)
+
+    return 0
+
+
+if __name__ == "__main__":
+    main()
+    main2()
@@ -0,0 +1,31 @@
+from pathlib import Path
+import pandas as pd
+from fuplot import FuPlot, RGBA, aes
+
+
+def main() -> None:
+    data = pd.read_csv(Path("test_data") / "planets.csv")
+
+    plot = FuPlot(data, aes("distance", "orbital_period"), width=0.6)
+    plot.geom_point(fill=RGBA(0.2, 1, 0.4), opacity=0.5)
+
+    # geoms are rebuilt from their layers, so rendering twice gives the same comp
+    first = plot.render()
+    print("same twice:", plot.render() == first)
+
+    # a copy shares the layers, and geoms added to it stay out of the original
+    wide = plot.copy(width=0.9)
+    wide.geom_bin2d(bins=10, fill=RGBA(1, 0.2, 0.4))
+    print("copy layers:", len(plot.layers), len(wide.layers))
+    print("copy differs:", wide.render() != first)
+    print("original kept:", plot.render() == first)
+
+    # data is read again at every render, and scales follow once invalidated
+    data.loc[:, "distance"] = data.distance * 2
+    print("stale scales:", plot.render() == first)
+    plot.invalidate_scales(data)
+    print("rescaled:", plot.render() == first)
+
+
+if __name__ == "__main__":
+    main()
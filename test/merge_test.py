@@ -0,0 +1,42 @@
+from pathlib import Path
+import pandas as pd
+import re
+from fuplot import FuPlot, RGBA, aes
+
+
+def main() -> None:
+    data = pd.read_csv(Path("test_data") / "IVV.csv", parse_dates=["Date"])
+
+    plot = FuPlot(data, aes("Date"), width=0.6, height=0.5)
+    for i, column in enumerate(["Open", "High", "Low", "Close", "Adj Close"]):
+        plot.geom_line(mapping=aes(y=column), color=RGBA(i / 4, 0.5, 1 - i / 4))
+
+    # the tree is shallower, and stacks the layers in the same order as the chain
+    for merge in ("chain", "tree"):
+        stack, depth = merge_stack(plot.render(merge=merge))
+        print(f"{merge}: depth {depth}, {stack}")
+
+
+def merge_stack(text: str) -> tuple[list[str], int]:
+    """Layers in stacking order, bottom first, and the depth of the merge graph."""
+
+    merges = {}
+    for name, body in re.findall(r"(\w+) = Merge \{(.*?)\n\}", text, re.DOTALL):
+        merges[name] = tuple(
+            re.search(rf'{layer} = Input \{{ SourceOp = "(\w+)"', body)[1]
+            for layer in ("Background", "Foreground")
+        )
+    inputs = {op for pair in merges.values() for op in pair}
+    (top,) = [name for name in merges if name not in inputs]
+
+    def walk(name: str) -> tuple[list[str], int]:
+        if name not in merges:
+            return [name], 0
+        (bottom, d1), (over, d2) = map(walk, merges[name])
+        return bottom + over, max(d1, d2) + 1
+
+    return walk(top)
+
+
+if __name__ == "__main__":
+    main()
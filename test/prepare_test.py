@@ -0,0 +1,20 @@
+import numpy as np
+import pandas as pd
+from fuplot.prepare import prepare_data, project
+
+data = pd.DataFrame(
+    dict(
+        x=np.arange(8.0),
+        y=[1, 2, np.nan, 4, np.inf, 6, 7, -np.inf],
+        label=list("abcdefgh"),
+        unused=np.zeros(8),
+    )
+)
+mapping = dict(x="x", y="y")
+
+print(project(data, mapping).columns.tolist())
+for policy in ("drop", "clip", "break"):
+    print(policy, prepare_data(data, mapping, policy, breaks=True).y.tolist())
+
+# numeric columns are passed on without being copied
+print(np.shares_memory(project(data, mapping).x.to_numpy(), data.x.to_numpy()))
@@ -0,0 +1,35 @@
+from pathlib import Path
+import io
+import pandas as pd
+from fuplot import FuPlot, RGBA, RenderCache, aes
+
+
+def main() -> None:
+    data = pd.read_csv(Path("test_data") / "planets.csv")
+
+    plot = FuPlot(data, aes("distance", "orbital_period"), width=0.6)
+    plot.geom_point(fill=RGBA(0.2, 1, 0.4), opacity=0.5)
+    plot.geom_point(backend="shape", max_points=100)
+    plot.geom_bin2d(bins=10, fill=RGBA(1, 0.2, 0.4))
+
+    plot.render(profile=True)
+    report(plot.last_profile)
+
+    # reports can go to a callback instead, and mark geoms read from the cache
+    plot.render_cache = RenderCache()
+    plot.render_to(io.StringIO())
+    plot.render_to(io.StringIO(), profile=report)
+
+
+def report(profile) -> None:
+    """Everything in the report but timings, which change from run to run."""
+
+    print("phases:", list(profile.phases))
+    for geom in profile.geoms:
+        cached = " (cached)" if geom.cached else ""
+        print(f"  {geom.name}: {geom.rows} rows, {geom.nodes} nodes{cached}")
+    print(f"  {profile.rows} rows, {profile.nodes} nodes, {profile.output_chars} chars")
+
+
+if __name__ == "__main__":
+    main()
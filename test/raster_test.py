@@ -0,0 +1,21 @@
+import numpy as np
+from fuplot.raster import rasterize_points, rasterize_line
+
+# a million points and a line of a hundred thousand, drawn at 1920x1080
+rng = np.random.default_rng(0)
+resolution = (1920, 1080)
+
+x, y = rng.random(1_000_000), rng.random(1_000_000)
+alpha = rasterize_points(x, y, np.full(len(x), 0.003), 0.25, resolution)
+print(f"points: {alpha.shape}, mean alpha {alpha.mean():.3f}")
+
+x = np.linspace(0.1, 0.9, 100_000)
+y = 0.5 + np.cumsum(rng.normal(0, 0.001, len(x)))
+alpha = rasterize_line(x, y, 0.002, resolution)
+print(f"line: {alpha.shape}, {(alpha > 0).sum()} pixels drawn")
+
+# a single disk covers about as many pixels as its area
+alpha = rasterize_points(
+    np.array([0.5]), np.array([0.5]), np.array([0.05]), 1, resolution
+)
+print(f"disk: {alpha.sum():.0f} pixels, area {np.pi * (0.025 * 1920) ** 2:.0f}")
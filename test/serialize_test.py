@@ -0,0 +1,47 @@
+from pathlib import Path
+import gzip
+import io
+import os
+import pandas as pd
+import tempfile
+from fuplot import FuPlot, RGBA, aes
+
+
+def main() -> None:
+    data = pd.read_csv(Path("test_data") / "planets.csv")
+
+    plot = FuPlot(data, aes("distance", "orbital_period"), width=0.6)
+    plot.geom_point(fill=RGBA(0.2, 1, 0.4), opacity=0.5)
+    plot.geom_bin2d(bins=10, fill=RGBA(1, 0.2, 0.4))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "planets.setting"
+        written = plot.render_to(path)
+        text = path.read_text(encoding="utf-8")
+        print(f"render_to: {written} characters, {len(text)} in the file")
+
+        # a .gz suffix compresses the same text
+        plot.render_to(path.with_suffix(".setting.gz"))
+        with gzip.open(path.with_suffix(".setting.gz"), "rt", encoding="utf-8") as f:
+            print("gzip:", f.read() == text)
+
+        # file objects are written to as they are
+        buffer = io.StringIO()
+        plot.render_to(buffer)
+        print("file object:", buffer.getvalue() == text)
+
+        # tools are written one at a time, and read just like the clipboard's comp
+        print("same as render():", plot.render() == text)
+
+        # a failing render leaves the previous file in place, and no temporary file
+        plot.geom_point(backend="missing")
+        try:
+            plot.render_to(path)
+        except ValueError as e:
+            print("failed:", e)
+        print("kept:", path.read_text(encoding="utf-8") == text)
+        print("files:", sorted(os.listdir(tmp)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+from pathlib import Path
+from fuplot import FuPlot, RGBA, aes
+from fuplot.sources import ChunkedSource
+
+
+def main() -> None:
+    # read 100 rows at a time, as if the file didn't fit in memory
+    data = ChunkedSource.from_csv(Path("test_data") / "planets.csv", chunksize=100)
+
+    plot = FuPlot(data, aes("distance", "orbital_period"), width=0.6)
+    plot.geom_point(fill=RGBA(0.2, 1, 0.4), opacity=0.5)
+    plot.geom_bin2d(bins=10, fill=RGBA(1, 0.2, 0.4))
+
+    for geom_name, nodes, n_bytes in plot.estimate():
+        print(f"{geom_name}: {nodes} nodes, {n_bytes} bytes")
+    plot.render()
+
+    # every discovery method is a level, whichever chunks it shows up in
+    plot = FuPlot(data, aes("distance", "orbital_period", color="method"))
+    plot.geom_point()
+    plot.render()
+    print("methods:", plot.mapping_scales["color"])
+
+    # binned geoms only keep the columns they bin, whatever else the plot maps
+    plot = FuPlot(data, aes("distance", "orbital_period"))
+    plot.geom_histogram(bins=20)
+    plot.render()
+
+    plot = FuPlot(data, aes("distance", "orbital_period", color="method"))
+    plot.geom_bin2d(bins=10)
+    plot.render()
+    print("binned chunks:", [len(geom.data) for geom in plot.geoms])
+
+
+if __name__ == "__main__":
+    main()